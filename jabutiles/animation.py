@@ -0,0 +1,169 @@
+"""Looping animation frames, derived from a single generated base.
+
+Frames come from cheap operations over a texture built once:
+
+- `scroll_frames`: the texture slides (wrapping) a whole number of times per loop.
+- `crossfade_frames`: blends to a second texture and back.
+- `noise_frames`: runs a named recipe once over periodic noise, each frame a phase of it.
+
+An `AnimatedTile` composites the static layers of a Tile once,
+and only pastes the animated ones over it for each frame:
+
+```
+water = TextureGen.named_texture(32, 'water', seed=1)
+tile = AnimatedTile([Layer(water), Layer(sand, edge), Layer(None, shape)],
+                    {0: scroll_frames(water, 16, (1, 0))})
+tile.save('water.gif', duration=80)
+```
+"""
+
+import random as rnd
+from typing import Any, Literal, Sequence
+from functools import partial
+
+import numpy as np
+from PIL import Image
+
+from jabutiles.tile import Tile
+from jabutiles.layer import Layer
+from jabutiles.texture import Texture, TextureGen, TextureStack
+
+
+
+def loop_phases(count: int) -> np.typing.NDArray:
+    """The `count` angles of a loop, never reaching the first one again."""
+    
+    return 2 * np.pi * np.arange(count) / count
+
+
+def scroll_frames(
+        texture: Texture,
+        count: int,
+        cycles: tuple[int, int] = (1, 0),
+    ) -> list[Texture]:
+    """The `texture` scrolled (wrapping) by `cycles` of its (width, height) over the loop."""
+    
+    W, H = texture.size
+    
+    return [
+        texture.offset((round(cycles[0] * W * idx / count), round(cycles[1] * H * idx / count)), 'wrap')
+        for idx in range(count)
+    ]
+
+
+def crossfade_frames(
+        first: Texture,
+        second: Texture,
+        count: int,
+    ) -> list[Texture]:
+    """Eases from `first` to `second` and back, over the loop."""
+    
+    a = first.as_array.astype(np.float32)
+    b = second.as_array.astype(np.float32)
+    
+    weights = (1 - np.cos(loop_phases(count))) / 2
+    
+    frames = a + (b - a) * weights[:, None, None, None]
+    
+    return list(TextureStack(np.round(frames).astype(np.uint8)))
+
+
+def periodic_noise(
+        count: int,
+        size: int | tuple[int, int],
+        ranges: list[tuple[int, int]],
+        mode: Literal['minmax', 'avgdev'] = 'minmax',
+        rng: np.random.Generator = None,
+    ) -> TextureStack:
+    """Like `TextureGen.random_rgb_batch`, but every pixel cycles smoothly over the `count` frames.
+    Two noise draws are mixed by the cosine and sine of the frame phase."""
+    
+    pair = TextureGen.random_rgb_batch(2, size, ranges, mode, rng).array.astype(np.float32)
+    
+    center = pair.mean(axis=(0, 1, 2))
+    first, second = pair - center
+    
+    phases = loop_phases(count)[:, None, None, None]
+    frames = center + first * np.cos(phases) + second * np.sin(phases)
+    
+    return TextureStack(np.clip(np.round(frames), 0, 255).astype(np.uint8))
+
+
+def noise_frames(
+        size: int | tuple[int, int],
+        name: str,
+        count: int,
+        seed: int = None,
+        **params,
+    ) -> TextureStack:
+    """The named recipe run once over periodic noise, giving `count` looping frames."""
+    
+    if isinstance(size, int):
+        size = (size, size)
+    
+    recipe, _ = TextureGen.RECIPES[name.lower()]
+    
+    rng = np.random.default_rng(seed) if seed is not None else None
+    noise = partial(periodic_noise, count, rng=rng)
+    
+    return recipe(size, noise, **params)
+
+
+
+class AnimatedTile:
+    """A Tile whose layers may change texture every frame."""
+    
+    # DUNDERS # ---------------------------------------------------------------
+    def __init__(self,
+            layers: list[Layer],
+            frames: dict[int, Sequence[Texture]],
+            seed: int = 0,
+        ) -> None:
+        """`frames` are the textures of each animated layer, by layer index, all of the same count.  
+        Outlined Shades draw from a generator of the `seed`, restarted every frame,
+        so their outlines stay still instead of flickering."""
+        
+        counts = {len(textures) for textures in frames.values()}
+        assert len(counts) == 1, f"Animated layers have different frame counts: {counts}"
+        
+        self.layers: list[Layer] = list(layers)
+        self.frames: dict[int, Sequence[Texture]] = frames
+        self.seed: int = seed
+        
+        # Layers below the first animated one are composited only once
+        self._first: int = min(frames)
+        self._static: Image.Image | None = None
+        if self._first:
+            self._static = Tile.composite(self.layers[:self._first], rng=rnd.Random(seed))
+    
+    def __str__(self) -> str:
+        return f"ANIMATEDTILE | frames:{len(self)} animated:{sorted(self.frames)}"
+    
+    def __len__(self) -> int:
+        return len(next(iter(self.frames.values())))
+    
+    # METHODS # ---------------------------------------------------------------
+    def frame(self,
+            idx: int,
+        ) -> Image.Image:
+        
+        layers = [
+            Layer(self.frames[pos][idx], layer.mask, layer.on_self, layer.on_other) if pos in self.frames else layer
+            for pos, layer in enumerate(self.layers[self._first:], self._first)
+        ]
+        
+        return Tile.composite(layers, self._static, rnd.Random(self.seed))
+    
+    def images(self) -> list[Image.Image]:
+        return [self.frame(idx) for idx in range(len(self))]
+    
+    def save(self,
+            path: str,
+            duration: int = 100,
+            **params: Any,
+        ) -> None:
+        """Writes every frame as a looping animation (GIF, WebP or APNG, by the extension)."""
+        
+        first, *others = self.images()
+        
+        first.save(path, save_all=True, append_images=others, duration=duration, loop=0, **params)
@@ -0,0 +1,250 @@
+"""Packs rendered tiles into a few large sheets, plus a JSON index.
+
+Tiles are added one by one and only the current sheet is kept in memory,
+each full sheet is written as soon as the next one starts:
+
+```
+with AtlasBuilder('out/terrain', (1024, 1024), packing='grid') as atlas:
+    for name, tile in tiles:
+        atlas.add(name, tile)
+```
+
+Writes `out/terrain_0.png`, `out/terrain_1.png`, ... and `out/terrain.json`, indexing
+for each tile its sheet, pixel rectangle, UV rectangle and edge code.
+Identical tiles are stored once, their entries sharing the same rectangle.
+With `mipmaps`, each sheet also gets its reduced levels (`out/terrain_0_mip1.png`, ...),
+every tile reduced on its own and extruded into the padding (see `mipmap.atlas_mipmaps`).
+"""
+
+import os
+import json
+from typing import Any, Literal
+
+import numpy as np
+from PIL import Image
+
+from jabutiles.base import BaseImage
+from jabutiles.tile import Tile
+from jabutiles.mipmap import atlas_mipmaps
+from jabutiles.utils_img import image_digest
+
+
+
+class AtlasBuilder:
+    """Packs images into fixed size sheets, on a grid or on shelves.
+    
+    - `grid`: every tile has the size of the first one, placed in rows and columns.
+    - `shelf`: tiles of any size, placed left to right on the first shelf (row) they fit.
+    """
+    
+    # DUNDERS # ---------------------------------------------------------------
+    def __init__(self,
+            path: str,
+            sheet_size: tuple[int, int] = (1024, 1024),
+            packing: Literal['grid', 'shelf'] = 'grid',
+            padding: int = 0,
+            ext: str = 'png',
+            mipmaps: int = 0,
+        ) -> None:
+        """`path` is the prefix of the sheets and index files, `padding` the space between tiles.
+        `mipmaps` is how many reduced levels to write per sheet, tiles and padding
+        then needing sizes multiple of 2 ** mipmaps."""
+        
+        assert packing in ('grid', 'shelf'), f"Unknown packing: {packing}"
+        assert padding % (1 << mipmaps) == 0, \
+            f"Padding must be a multiple of {1 << mipmaps} for {mipmaps} mipmaps"
+        
+        self.path: str = path
+        self.sheet_size: tuple[int, int] = sheet_size
+        self.packing: str = packing
+        self.padding: int = padding
+        self.ext: str = ext
+        self.mipmaps: int = mipmaps
+        
+        self.sheets: list[dict[str, Any]] = []
+        self.tiles: dict[str, dict[str, Any]] = {}
+        
+        # Where each unique image was placed, by digest
+        self._placed: dict[str, tuple[int, tuple[int, int, int, int]]] = {}
+        
+        self._sheet: np.typing.NDArray = None
+        self._cell: tuple[int, int] = None
+        self._count: int = 0
+        self._shelves: list[list[int]] = []    # [y, height, x cursor] of each shelf
+        self._rects: list[tuple[int, int, int, int]] = []   # Of the current sheet
+    
+    def __str__(self) -> str:
+        return f"ATLASBUILDER | {self.packing} tiles:{len(self.tiles)} unique:{len(self._placed)} sheets:{len(self.sheets)}"
+    
+    def __enter__(self) -> "AtlasBuilder":
+        return self
+    
+    def __exit__(self, *exc) -> None:
+        self.close()
+    
+    # METHODS # ---------------------------------------------------------------
+    def add(self,
+            name: str,
+            tile: Tile | BaseImage | Image.Image,
+            edges: str = None,
+        ) -> dict[str, Any]:
+        """Packs the `tile` image, unless an identical one is already packed.
+        The `edges` code defaults to the Tile's combined edge masks."""
+        
+        assert name not in self.tiles, f"Duplicated tile name: {name}"
+        
+        if edges is None and isinstance(tile, Tile):
+            edges = tile.edges
+        
+        image = tile.image if isinstance(tile, (Tile, BaseImage)) else tile
+        image = image.convert('RGBA')
+        
+        step = 1 << self.mipmaps
+        assert image.width % step == 0 and image.height % step == 0, \
+            f"Tile {name} of size {image.size} must be a multiple of {step} for {self.mipmaps} mipmaps"
+        
+        digest = image_digest(image)
+        
+        if digest not in self._placed:
+            self._placed[digest] = self._place(image)
+        
+        sheet, (x, y, w, h) = self._placed[digest]
+        W, H = self.sheet_size
+        
+        self.tiles[name] = {
+            'sheet': sheet,
+            'rect': [x, y, w, h],
+            'uv': [x / W, y / H, (x + w) / W, (y + h) / H],
+            'edges': edges,
+            'digest': digest,
+        }
+        
+        return self.tiles[name]
+    
+    def close(self) -> dict[str, Any]:
+        """Writes the last sheet and the JSON index, returning the index."""
+        
+        if self._sheet is not None:
+            self._flush()
+        
+        index = {
+            'sheet_size': list(self.sheet_size),
+            'sheets': self.sheets,
+            'tiles': self.tiles,
+        }
+        
+        with open(f"{self.path}.json", 'w') as file:
+            json.dump(index, file, indent=1)
+        
+        return index
+    
+    def _place(self,
+            image: Image.Image,
+        ) -> tuple[int, tuple[int, int, int, int]]:
+        """Finds a free spot on the current sheet (or a new one) and pastes the image."""
+        
+        w, h = image.size
+        W, H = self.sheet_size
+        P = self.padding
+        
+        assert w <= W and h <= H, f"Tile of size {image.size} is larger than the sheet"
+        
+        if self._sheet is None:
+            self._new_sheet()
+        
+        match self.packing:
+            case 'grid':
+                if self._cell is None:
+                    self._cell = w, h
+                
+                assert (w, h) == self._cell, \
+                    f"Grid packing needs same size tiles: {image.size} vs {self._cell}"
+                
+                cols = max(1, (W + P) // (w + P))
+                rows = max(1, (H + P) // (h + P))
+                
+                if self._count == cols * rows:
+                    self._flush()
+                    self._new_sheet()
+                
+                row, col = divmod(self._count, cols)
+                x, y = col * (w + P), row * (h + P)
+            
+            case 'shelf':
+                spot = self._shelf_spot(w, h)
+                
+                if spot is None:
+                    self._flush()
+                    self._new_sheet()
+                    spot = self._shelf_spot(w, h)
+                
+                x, y = spot
+        
+        self._sheet[y:y+h, x:x+w] = np.asarray(image)
+        self._rects.append((x, y, w, h))
+        self._count += 1
+        
+        return len(self.sheets), (x, y, w, h)
+    
+    def _shelf_spot(self,
+            w: int,
+            h: int,
+        ) -> tuple[int, int] | None:
+        """The tightest shelf with room for (w, h), opening a new one if needed."""
+        
+        W, H = self.sheet_size
+        P = self.padding
+        
+        fits = [shelf for shelf in self._shelves if h <= shelf[1] and shelf[2] + w <= W]
+        
+        if fits:
+            shelf = min(fits, key=lambda shelf: shelf[1])
+        
+        else:
+            top = self._shelves[-1][0] + self._shelves[-1][1] + P if self._shelves else 0
+            if top + h > H:
+                return None
+            
+            shelf = [top, h, 0]
+            self._shelves.append(shelf)
+        
+        x = shelf[2]
+        shelf[2] += w + P
+        
+        return x, shelf[0]
+    
+    def _new_sheet(self) -> None:
+        W, H = self.sheet_size
+        
+        self._sheet = np.zeros((H, W, 4), np.uint8)
+        self._count = 0
+        self._shelves = []
+        self._rects = []
+    
+    def _flush(self) -> None:
+        """Writes the current sheet and releases it."""
+        
+        file = f"{self.path}_{len(self.sheets)}.{self.ext}"
+        
+        folder = os.path.dirname(file)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        
+        entry = {'file': os.path.basename(file), 'tiles': self._count}
+        
+        if self.mipmaps:
+            base, *levels = atlas_mipmaps(self._sheet, self._rects, self.mipmaps + 1, self.padding)
+            
+            entry['mips'] = []
+            for level, sheet in enumerate(levels, 1):
+                mip = f"{self.path}_{len(self.sheets)}_mip{level}.{self.ext}"
+                Image.fromarray(sheet, 'RGBA').save(mip)
+                entry['mips'].append(os.path.basename(mip))
+        
+        else:
+            base = self._sheet
+        
+        Image.fromarray(base, 'RGBA').save(file)
+        
+        self.sheets.append(entry)
+        self._sheet = None
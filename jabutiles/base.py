@@ -16,6 +16,8 @@ class BaseImage(Generic[B]):
     Encapsulates methods used by tilers.
     """
     
+    __slots__ = ('_builder', '_image', '__weakref__')
+    
     # DUNDERS # ----------------------------------------------------------------
     def __init__(self,
             image: str | Image.Image | np.typing.NDArray = None,
@@ -23,9 +25,13 @@ class BaseImage(Generic[B]):
         ) -> None:
         """
         Can receive an Image:
-            - From a path (str)
+            - From a path (str), decoded once per process (see `loader`)
             - From another Image (copy)
             - From raw data (np.array)
+        
+        Paths are converted to `params['mode']`, and use a decoded `.npy` if `params['sidecar']`.  
+        The pixels are copied, so later changes to the source don't show here,
+        unless `params['share']`, for images made internally and never changed.
         """
         # print("BaseImage.__init__")
         
@@ -36,7 +42,10 @@ class BaseImage(Generic[B]):
             self._image = image
         
         elif isinstance(image, str):
-            self._image = Image.open(image)
+            # Avoids circular import
+            from jabutiles.loader import load_image
+            
+            self._image = load_image(image, params.get("mode"), params.get("sidecar", False))
         
         elif isinstance(image, np.ndarray):
             self._image = Image.fromarray(image)
@@ -45,6 +54,12 @@ class BaseImage(Generic[B]):
             # A magenta pixel
             self._image = Image.new('RGB', (1, 1), (255, 0, 255))
             # raise Exception(f"wtf")
+        
+        # Arrays are mapped, not copied (paths are loaded as copies). A conversion to the mode copies already
+        mode = params.get("mode")
+        owned = params.get("share", False) or isinstance(image, str)
+        if not owned and (mode is None or self._image.mode == mode):
+            self._image = self._image.copy()
     
     def __str__(self) -> str:
         return f"BASE | size:{self.size} mode:{self.mode}"
@@ -93,14 +108,14 @@ class BaseImage(Generic[B]):
     def copy(self) -> B:
         """Returns a deep copy."""
         
-        return self._builder(self._image.copy(), builder=self._builder)
+        return self._builder(self._image.copy(), builder=self._builder, share=True)
     
     def copy_with_params(self,
             image: Image.Image,
         ) -> B:
         """Returns a deep copy but keeping the original parameters."""
         
-        return self._builder(image, builder=self._builder)
+        return self._builder(image, builder=self._builder, share=True)
     
     def display(self,
             factor: float = 1.0,
@@ -110,8 +125,10 @@ class BaseImage(Generic[B]):
         
         display(ImageOps.scale(self.image, factor, resample)) # type: ignore
     
-    def save(self, path: str) -> None:
-        self.image.save(path)
+    def save(self, path: str, **params) -> None:
+        """The `params` are passed to `Image.save`, e.g. `compress_level=1`."""
+        
+        self.image.save(path, **params)
     
     # IMAGE OPERATIONS
     def rotate(self, # VALIDATED
@@ -297,10 +314,11 @@ class BaseImage(Generic[B]):
             color: str | tuple[int, int, int] = "white",
             combine: bool = True,
             dist: float = 1.0,
+            rng: rnd.Random = None,
         ) -> B:
         
         base_image = self.image.copy()
-        outline = get_outline(base_image, thickness, color, dist)
+        outline = get_outline(base_image, thickness, color, dist, rng)
         
         if combine:
             base_image.paste(outline, mask=outline)
@@ -311,7 +329,10 @@ class BaseImage(Generic[B]):
             size: tuple[int, int],
             mirrors: list[str] = None,
             rotations: list[int] = None,
+            rng: rnd.Random = None,
         ) -> B:
+        """Tiles the image over `size`, each copy with a random rotation and mirror.
+        Pass a seeded `rng` for reproducible (and thread independent) results."""
         
         # Simple repetition without changes
         if rotations is None and mirrors is None:
@@ -322,11 +343,13 @@ class BaseImage(Generic[B]):
         
         base: Image.Image = Image.new(self.mode, size)
         
+        choice = rnd.choice if rng is None else rng.choice
+        
         W, H = self.size
         for row in range(0, size[1], H):
             for col in range(0, size[0], W):
-                r = rnd.choice(rotations)
-                m = rnd.choice(mirrors)
+                r = choice(rotations)
+                m = choice(mirrors)
                 
                 image = self.rotate(r).reflect(m).image
                 base.paste(image, (col, row))
@@ -0,0 +1,167 @@
+"""Rebuilds a tileset incrementally, like a build system.
+
+Every tile is a `Recipe` whose digest covers all of its inputs:
+generator parameters, seeds, recipe versions, masks, shades and layers.
+The output folder keeps a `manifest.json` with the digest and file of each tile,
+plus the dependency graph of the nodes used to build them.
+
+A rebuild only renders the tiles whose digest changed (or whose file is gone),
+and removes the files of tiles no longer in the spec:
+
+```
+report = rebuild('tileset.toml', 'out/')
+print(report['built'], report['kept'], report['removed'])
+```
+"""
+
+import os
+import json
+from typing import Any
+
+from jabutiles.plan import Plan, Spec
+from jabutiles.export import export_many
+
+
+
+MANIFEST = 'manifest.json'
+
+
+class Manifest:
+    """What was built in an output folder, and from what."""
+    
+    # DUNDERS # ---------------------------------------------------------------
+    def __init__(self,
+            tiles: dict[str, dict[str, str]] = None,
+            nodes: dict[str, dict[str, Any]] = None,
+        ) -> None:
+        """
+        tiles: {name: {"digest": ..., "file": ...}}
+        nodes: {digest: {"op": ..., "deps": [digest, ...]}}
+        """
+        
+        self.tiles: dict[str, dict[str, str]] = tiles or {}
+        self.nodes: dict[str, dict[str, Any]] = nodes or {}
+    
+    def __str__(self) -> str:
+        return f"MANIFEST | tiles:{len(self.tiles)} nodes:{len(self.nodes)}"
+    
+    # METHODS # ---------------------------------------------------------------
+    @staticmethod
+    def load(path: str) -> "Manifest":
+        """Reads a manifest, or returns an empty one if there is none."""
+        
+        if not os.path.exists(path):
+            return Manifest()
+        
+        with open(path, 'r') as file:
+            data = json.load(file)
+        
+        return Manifest(data.get('tiles'), data.get('nodes'))
+    
+    def save(self,
+            path: str,
+        ) -> None:
+        """Writes to a temporary file first, so a crash never leaves half a manifest."""
+        
+        data = {'tiles': self.tiles, 'nodes': self.nodes}
+        
+        with open(path + '.tmp', 'w') as file:
+            json.dump(data, file, indent=1, sort_keys=True)
+        
+        os.replace(path + '.tmp', path)
+    
+    def record(self,
+            plan: Plan,
+            files: dict[str, str],
+        ) -> None:
+        """Replaces the contents with the tiles of `plan`, saved as `files`."""
+        
+        self.tiles = {
+            name: {'digest': recipe.digest, 'file': files[name]}
+            for name, recipe in plan.tiles.items()
+        }
+        
+        self.nodes = {
+            digest: {'op': plan.nodes[digest].op, 'deps': sorted(plan.deps[digest])}
+            for digest in plan.order
+        }
+    
+    def dependents(self,
+            digest: str,
+        ) -> set[str]:
+        """The names of the tiles that use the node `digest`, at any depth."""
+        
+        users: dict[str, set[str]] = {}
+        for node, info in self.nodes.items():
+            for dep in info['deps']:
+                users.setdefault(dep, set()).add(node)
+        
+        # Every node reachable upwards from the digest
+        found, stack = {digest}, [digest]
+        while stack:
+            for user in users.get(stack.pop(), ()):
+                if user not in found:
+                    found.add(user)
+                    stack.append(user)
+        
+        return {name for name, info in self.tiles.items() if info['digest'] in found}
+
+
+
+def rebuild(
+        spec: Spec | str | Plan,
+        outdir: str,
+        workers: int = 0,
+        force: bool = False,
+        ext: str = 'png',
+    ) -> dict[str, list[str]]:
+    """Renders into `outdir` only the tiles that changed since the last build.
+    
+    Args:
+        spec: a spec (dict or file path) or an already compiled Plan.
+        outdir: the output folder, holding the images and the manifest.
+        workers: processes used to render, 0 renders in this process.
+        force: renders every tile, ignoring the manifest.
+        ext: the image format of the exported tiles.
+    
+    Returns:
+        The tile names that were `built`, `kept` and `removed`.
+    """
+    
+    plan = spec if isinstance(spec, Plan) else Plan.compile(spec)
+    
+    os.makedirs(outdir, exist_ok=True)
+    manifest_path = os.path.join(outdir, MANIFEST)
+    manifest = Manifest.load(manifest_path)
+    
+    files = {name: f"{name}.{ext}" for name in plan.tiles}
+    
+    # A tile is up to date if it has the same digest and its file still exists
+    stale = {}
+    for name, recipe in plan.tiles.items():
+        old = manifest.tiles.get(name)
+        
+        if (force or old is None or old['digest'] != recipe.digest or old['file'] != files[name]
+            or not os.path.exists(os.path.join(outdir, files[name]))):
+            stale[name] = recipe
+    
+    # Rendering and encoding overlap, the images being saved by a thread pool
+    export_many(
+        (os.path.join(outdir, files[name]), image) for name, image in Plan(stale).run(workers))
+    
+    # Removes the images of tiles no longer in the spec
+    removed = [name for name in manifest.tiles if name not in plan.tiles]
+    for name in removed:
+        file = manifest.tiles[name]['file']
+        path = os.path.join(outdir, file)
+        if file not in files.values() and os.path.exists(path):
+            os.remove(path)
+    
+    manifest.record(plan, files)
+    manifest.save(manifest_path)
+    
+    return {
+        'built': list(stale),
+        'kept': [name for name in plan.tiles if name not in stale],
+        'removed': removed,
+    }
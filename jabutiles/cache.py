@@ -0,0 +1,310 @@
+"""Caches for generated images.
+
+A `MemoryCache` keeps the most recently used objects in the process.
+A `DiskCache` keeps raw arrays as `.npy` files, surviving the process,
+memory-mapped on read, size limited and versioned.
+A `TieredCache` combines both, checking the memory before the disk.
+"""
+
+import os
+import shutil
+import threading
+import hashlib
+import tempfile
+from typing import Any, Hashable, Callable
+from collections import OrderedDict
+from importlib import metadata
+
+import numpy as np
+
+from jabutiles.base import BaseImage
+from jabutiles.utils_img import map_array
+
+
+
+def _library_version() -> str:
+    try:
+        return metadata.version("jabutiles")
+    except metadata.PackageNotFoundError:
+        return "dev"
+
+
+# Disk entries of other versions are ignored, bump FORMAT when they change layout
+FORMAT = 1
+CACHE_VERSION = f"{_library_version()}.{FORMAT}"
+
+
+def make_key(*parts: Hashable) -> str:
+    """Returns a stable hexdigest for the given `parts`.
+    Used as filename, so it must not depend on the running process.
+    """
+    
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+
+class MemoryCache:
+    """A Least Recently Used cache, limited by the number of entries.  
+    Safe to share between threads."""
+    
+    # DUNDERS # ---------------------------------------------------------------
+    def __init__(self,
+            maxsize: int = 128,
+        ) -> None:
+        
+        self.maxsize: int = maxsize
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+    
+    def __str__(self) -> str:
+        return f"MEMORYCACHE | size:{len(self)}/{self.maxsize}"
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+    
+    # METHODS # ---------------------------------------------------------------
+    def get(self,
+            key: Hashable,
+            default: Any = None,
+        ) -> Any:
+        
+        with self._lock:
+            if key not in self._entries:
+                return default
+            
+            # Marks as the most recently used
+            self._entries.move_to_end(key)
+            
+            return self._entries[key]
+    
+    def put(self,
+            key: Hashable,
+            value: Any,
+        ) -> None:
+        
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            
+            # Evicts the least recently used
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+
+class DiskCache:
+    """Stores raw arrays as `.npy` files inside a folder.
+    
+    - Entries live in a subfolder per `version`, so a new library version starts empty.
+    - Reads are memory-mapped and read-only, nothing is loaded until used.
+    - Writes go to a temporary file renamed in place, safe for concurrent processes.
+    - With a `maxsize` (bytes), the least recently used files are evicted.
+    """
+    
+    # DUNDERS # ---------------------------------------------------------------
+    def __init__(self,
+            path: str,
+            maxsize: int = None,
+            version: str = CACHE_VERSION,
+            mmap: bool = True,
+        ) -> None:
+        
+        self.root: str = path
+        self.path: str = os.path.join(path, f"v{version}")
+        self.maxsize: int | None = maxsize
+        self.mmap: bool = mmap
+        
+        os.makedirs(self.path, exist_ok=True)
+        
+        # Estimated folder size, only scanned again when above the limit
+        self._size: int = self.size if maxsize else 0
+    
+    def __str__(self) -> str:
+        return f"DISKCACHE | path:{self.path}"
+    
+    def __contains__(self, key: Hashable) -> bool:
+        return os.path.isfile(self.filename(key))
+    
+    # PROPERTIES # ------------------------------------------------------------
+    @property
+    def size(self) -> int:
+        """Bytes used by the entries."""
+        
+        return sum(size for _, _, size in self._entries())
+    
+    # METHODS # ---------------------------------------------------------------
+    def filename(self,
+            key: Hashable,
+        ) -> str:
+        
+        return os.path.join(self.path, f"{make_key(key)}.npy")
+    
+    def get(self,
+            key: Hashable,
+        ) -> np.typing.NDArray | None:
+        
+        filename = self.filename(key)
+        
+        try:
+            array = np.load(filename, mmap_mode='r' if self.mmap else None)
+        
+        except (FileNotFoundError, ValueError, EOFError):
+            return None
+        
+        # Marks as the most recently used, for eviction
+        try:
+            os.utime(filename)
+        except OSError:
+            pass
+        
+        return array
+    
+    def put(self,
+            key: Hashable,
+            array: np.typing.NDArray,
+        ) -> None:
+        
+        handle, temp = tempfile.mkstemp(suffix=".tmp", dir=self.path)
+        
+        try:
+            with os.fdopen(handle, 'wb') as file:
+                np.save(file, np.ascontiguousarray(array))
+            
+            # Readers only ever see complete files
+            os.replace(temp, self.filename(key))
+        
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+        
+        if self.maxsize:
+            self._size += array.nbytes
+            
+            if self._size > self.maxsize:
+                self.evict()
+    
+    def evict(self) -> None:
+        """Removes the least recently used entries until under `maxsize`."""
+        
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        
+        for _, filename, size in entries:
+            if total <= self.maxsize:
+                break
+            
+            try:
+                os.remove(filename)
+            except OSError:
+                # Already removed by another process, or still mapped
+                continue
+            
+            total -= size
+        
+        self._size = total
+    
+    def clear(self) -> None:
+        for _, filename, _ in self._entries():
+            os.remove(filename)
+        
+        self._size = 0
+    
+    def prune(self) -> None:
+        """Removes the entries of every other version."""
+        
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            
+            if name.startswith('v') and os.path.isdir(path) and path != self.path:
+                shutil.rmtree(path, ignore_errors=True)
+    
+    def _entries(self) -> list[tuple[float, str, int]]:
+        """(last use, filename, size) of every entry."""
+        
+        entries = []
+        
+        for entry in os.scandir(self.path):
+            if not entry.name.endswith(".npy"):
+                continue
+            
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            
+            entries.append((stat.st_mtime, entry.path, stat.st_size))
+        
+        return entries
+
+
+
+class TieredCache:
+    """A `MemoryCache` backed by an optional `DiskCache`.
+    Stores `BaseImage`s, which are rebuilt by `builder` when read from disk.
+    Safe to share between threads, as both tiers are.
+    """
+    
+    # DUNDERS # ---------------------------------------------------------------
+    def __init__(self,
+            maxsize: int = 128,
+            path: str = None,
+            builder: Callable[[np.typing.NDArray], BaseImage] = BaseImage,
+            disksize: int = None,
+        ) -> None:
+        """`disksize` limits the bytes kept on disk."""
+        
+        self.memory: MemoryCache = MemoryCache(maxsize)
+        self.disk: DiskCache | None = DiskCache(path, disksize) if path else None
+        self.builder = builder
+    
+    def __str__(self) -> str:
+        return f"TIEREDCACHE | memory:{self.memory} disk:{self.disk}"
+    
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.memory or (self.disk is not None and key in self.disk)
+    
+    # METHODS # ---------------------------------------------------------------
+    def get(self,
+            key: Hashable,
+        ) -> BaseImage | None:
+        
+        image = self.memory.get(key)
+        if image is not None:
+            return image
+        
+        if self.disk is None:
+            return None
+        
+        array = self.disk.get(key)
+        if array is None:
+            return None
+        
+        # Promotes it back into memory, wrapping the mapped file when possible
+        image = self.builder(map_array(array), share=True)
+        self.memory.put(key, image)
+        
+        return image
+    
+    def put(self,
+            key: Hashable,
+            image: BaseImage,
+        ) -> None:
+        
+        self.memory.put(key, image)
+        
+        if self.disk is not None:
+            self.disk.put(key, image.as_array)
+    
+    def clear(self) -> None:
+        self.memory.clear()
+        
+        if self.disk is not None:
+            self.disk.clear()
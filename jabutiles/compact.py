@@ -0,0 +1,347 @@
+"""Compact representations for Textures and Masks.
+
+Generated materials use few distinct colors, and most masks are binary,
+so they can be stored in a fraction of the memory of the full images:
+- `IndexedTexture`: a 'P' mode image, one byte per pixel plus a palette.
+- `PackedMask`: a binary mask with one bit per pixel (`np.packbits`).
+"""
+
+import random as rnd
+from typing import Self, Literal, TYPE_CHECKING
+if TYPE_CHECKING:
+    from jabutiles.mask import Mask
+    from jabutiles.texture import Texture
+
+import numpy as np
+from PIL import Image
+
+from jabutiles.base import BaseImage
+from jabutiles.configs import Reflection, Rotation
+from jabutiles.utils_img import adjust_array
+
+
+
+class IndexedTexture(BaseImage["IndexedTexture"]):
+    """A Texture stored as palette indices ('P' mode) plus a palette.
+    Geometric operations work directly on the indices,
+    color operations only change the palette.
+    """
+    
+    __slots__ = ('_palette',)
+    
+    # DUNDERS # ---------------------------------------------------------------
+    def __init__(self,
+            image: Image.Image | np.typing.NDArray,
+            palette: np.typing.NDArray = None,
+            **params,
+        ) -> None:
+        """
+        Can receive:
+            - A 'P' mode Image (keeps its palette if none is given)
+            - Any other Image or array of indices, plus the `palette`
+        """
+        
+        params["builder"] = IndexedTexture
+        super().__init__(image, **params)
+        
+        if palette is None:
+            assert self._image.mode == 'P', "Indexed textures need a palette"
+            palette = np.reshape(self._image.getpalette('RGB'), (-1, 3))
+        
+        self._palette: np.typing.NDArray = np.asarray(palette, np.uint8).reshape(-1, 3)
+        
+        # Reinterprets the bytes as indices, whatever the source mode
+        if self._image.mode != 'P':
+            self._image = Image.frombytes('P', self.size, self._image.tobytes())
+        
+        self._image.putpalette(self._palette.tobytes(), 'RGB')
+    
+    def __str__(self) -> str:
+        return f"INDEXEDTEXTURE | size:{self.size} mode:{self.mode} colors:{self.colors}"
+    
+    # PROPERTIES # ------------------------------------------------------------
+    @property
+    def palette(self) -> np.typing.NDArray:
+        """The (K, 3) palette colors."""
+        
+        return self._palette
+    
+    @property
+    def colors(self) -> int:
+        return len(self._palette)
+    
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the indices and the palette."""
+        
+        return self.width * self.height + self._palette.nbytes
+    
+    # METHODS # ---------------------------------------------------------------
+    # BASIC INTERFACES
+    @staticmethod
+    def from_texture(
+            texture: "Texture",
+            colors: int = 256,
+        ) -> "IndexedTexture":
+        """Indexes the `texture` colors.
+        Lossless if it has at most `colors` distinct colors, else quantized.
+        """
+        
+        array = texture.as_array.astype(np.uint32)
+        packed = (array[..., 0] << 16) | (array[..., 1] << 8) | array[..., 2]
+        
+        unique, indices = np.unique(packed, return_inverse=True)
+        
+        if len(unique) <= min(colors, 256):
+            palette = np.stack((unique >> 16, unique >> 8, unique), axis=-1) & 0xFF
+            indices = indices.reshape(packed.shape).astype(np.uint8)
+            
+            return IndexedTexture(indices, palette)
+        
+        image = texture.image.quantize(colors, dither=Image.Dither.NONE)
+        
+        return IndexedTexture(image)
+    
+    def copy_with_params(self,
+            image: Image.Image | np.typing.NDArray,
+        ) -> Self:
+        """Returns a deep copy but keeping the original palette."""
+        
+        return self._builder(image, self._palette, builder=self._builder, share=True)
+    
+    def to_texture(self) -> "Texture":
+        from jabutiles.texture import Texture
+        
+        return Texture(self._image.convert('RGB'))
+    
+    # IMAGE OPERATIONS
+    def offset(self,
+            offset: int | tuple[int, int],
+            how: Literal[None, 'wrap', 'bleed'] = None,
+        ) -> "IndexedTexture | Texture":
+        """Same as `BaseImage.offset`, but filling with black (see `black_first`)."""
+        
+        if how is not None:
+            return super().offset(offset, how)
+        
+        texture = self.black_first()
+        if texture is None:
+            return self.to_texture().offset(offset)
+        
+        return BaseImage.offset(texture, offset)
+    
+    def rotate(self,
+            angle: Rotation,
+            expand: bool = True,
+        ) -> "IndexedTexture | Texture":
+        """Same as `BaseImage.rotate`, but filling with black (see `black_first`)."""
+        
+        if angle == 0:
+            return self
+        
+        texture = self.black_first()
+        if texture is None:
+            return self.to_texture().rotate(angle, expand)
+        
+        return BaseImage.rotate(texture, angle, expand)
+    
+    def repeat(self,
+            size: tuple[int, int],
+            mirrors: list[str] = None,
+            rotations: list[int] = None,
+            rng: rnd.Random = None,
+        ) -> "IndexedTexture | Texture":
+        """Same as `BaseImage.repeat`, but filling with black (see `black_first`)."""
+        
+        texture = self.black_first()
+        if texture is None:
+            return self.to_texture().repeat(size, mirrors, rotations, rng)
+        
+        return BaseImage.repeat(texture, size, mirrors, rotations, rng)
+    
+    def black_first(self) -> Self | None:
+        """The same texture with black as palette index 0, which new pixels are filled with.  
+        Black is moved there, or added if missing.  
+        Returns None if the palette is full without black."""
+        
+        black = np.flatnonzero(~self._palette.any(axis=1))
+        indices = np.asarray(self._image)
+        
+        if len(black) and black[0] == 0:
+            return self
+        
+        if len(black):
+            order = np.arange(self.colors)
+            order[[0, black[0]]] = order[[black[0], 0]]
+            
+            # The swap is its own inverse, mapping old indices to new ones too
+            return self._builder(order.astype(np.uint8)[indices], self._palette[order], builder=self._builder, share=True)
+        
+        if self.colors < 256:
+            palette = np.vstack((np.zeros((1, 3), np.uint8), self._palette))
+            
+            return self._builder(indices + np.uint8(1), palette, builder=self._builder, share=True)
+        
+        return None
+    
+    def smooth(self, *args, **kwargs) -> "Texture":
+        """Palettes can't be filtered, so it returns a full Texture."""
+        
+        return self.to_texture().smooth(*args, **kwargs)
+    
+    # COLOR OPERATIONS, only on the palette
+    def brightness(self, factor: float = 1.0) -> Self:
+        return self.adjust(brightness=factor)
+    
+    def color(self, factor: float = 1.0) -> Self:
+        return self.adjust(color=factor)
+    
+    def contrast(self, factor: float = 1.0) -> Self:
+        return self.adjust(contrast=factor)
+    
+    def adjust(self, **factors: float) -> Self:
+        """Same as `Texture.adjust`, but only the palette colors change."""
+        
+        steps = [(name, factor) for name, factor in factors.items() if factor != 1.0]
+        if not steps:
+            return self
+        
+        # Each color weights the mean by how many pixels use it
+        counts = np.bincount(self.as_array.ravel(), minlength=self.colors)
+        
+        palette = adjust_array(
+            self._palette[None], steps, counts[None, :self.colors])[0]
+        
+        return self._builder(self._image.copy(), palette, builder=self._builder, share=True)
+
+
+
+class PackedMask:
+    """A binary Mask stored with one bit per pixel.
+    Keeps the Mask type and parameters (shape, edges) to restore it later.
+    """
+    
+    # DUNDERS # ---------------------------------------------------------------
+    def __init__(self,
+            bits: np.typing.NDArray,
+            size: tuple[int, int],
+            builder: type = None,
+            **params,
+        ) -> None:
+        """`bits` are the rows packed by `np.packbits(..., axis=1)`."""
+        
+        from jabutiles.mask import Mask
+        
+        self._bits: np.typing.NDArray = bits
+        self._size: tuple[int, int] = size
+        self._builder: type = builder or Mask
+        self._params: dict = params
+    
+    def __str__(self) -> str:
+        return f"PACKEDMASK | size:{self.size} type:{self._builder.__name__}"
+    
+    # PROPERTIES # ------------------------------------------------------------
+    @property
+    def size(self) -> tuple[int, int]:
+        return self._size
+    
+    @property
+    def bits(self) -> np.typing.NDArray:
+        return self._bits
+    
+    @property
+    def nbytes(self) -> int:
+        return self._bits.nbytes
+    
+    @property
+    def image(self) -> Image.Image:
+        """The mask as a '1' mode Image, which shares the packed layout."""
+        
+        return Image.frombytes('1', self._size, self._bits.tobytes())
+    
+    @property
+    def as_array(self) -> np.typing.NDArray:
+        """The unpacked (H, W) boolean array."""
+        
+        bits = np.unpackbits(self._bits, axis=1, count=self._size[0])
+        
+        return bits.astype(bool)
+    
+    @property
+    def area(self) -> int:
+        """How many pixels are set."""
+        
+        return int(np.unpackbits(self._bits, axis=1, count=self._size[0]).sum())
+    
+    # METHODS # ---------------------------------------------------------------
+    # BASIC INTERFACES
+    @staticmethod
+    def from_mask(
+            mask: "Mask",
+            threshold: int = None,
+        ) -> "PackedMask":
+        """Packs the `mask`. Without a `threshold`, it must be binary (0 or 255)."""
+        
+        array = mask.as_array
+        
+        if threshold is None:
+            assert np.isin(array, (0, 255)).all(), \
+                "The mask is not binary, a threshold is needed"
+            threshold = 128
+        
+        params = {
+            name: getattr(mask, name)
+            for name in ('shape', 'edges') if hasattr(mask, name)
+        }
+        
+        bits = np.packbits(array >= threshold, axis=1)
+        
+        return PackedMask(bits, mask.size, type(mask), **params)
+    
+    def copy_with_params(self,
+            bits: np.typing.NDArray,
+            **params,
+        ) -> Self:
+        
+        params = {**self._params, **params}
+        
+        return PackedMask(bits, self._size, self._builder, **params)
+    
+    def to_mask(self) -> "Mask":
+        image = self.image.convert('L')
+        
+        return self._builder(image, share=True, **self._params)
+    
+    # EXPANDED OPERATIONS, bitwise on the packed rows
+    def invert(self) -> Self:
+        """'invert' as in 'negative'"""
+        
+        return self.copy_with_params(~self._bits)
+    
+    def merge(self,
+            other: "PackedMask",
+        ) -> Self:
+        
+        assert self.size == other.size, \
+            f"Incompatible mask sizes: {self.size=} vs {other.size=}"
+        
+        return self.copy_with_params(self._bits | other._bits)
+    
+    def diff(self,
+            other: "PackedMask",
+        ) -> Self:
+        """The opposite of merge"""
+        
+        return self.merge(other.invert()).invert()
+    
+    # IMAGE OPERATIONS
+    def reflect(self,
+            axis: Reflection,
+        ) -> "PackedMask":
+        """Top <-> bottom works on the packed rows, others need unpacking.  
+        Shaped masks always unpack, as they may also update their edges."""
+        
+        if axis == 'x' and not self._params:
+            return self.copy_with_params(self._bits[::-1].copy())
+        
+        return PackedMask.from_mask(self.to_mask().reflect(axis))
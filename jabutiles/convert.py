@@ -1,14 +1,22 @@
-from jabutiles.texture import Texture
+
+import numpy as np
+from PIL import Image
+
+from jabutiles.mask import ShapeMask
+from jabutiles.cache import MemoryCache
+from jabutiles.configs import Shape
+from jabutiles.texture import Texture, TextureStack
 from jabutiles.maskgen import ShapeMaskGen
 from jabutiles.utils import snap
 
 
 
 
-def convert_ort2iso(
+def _ort2iso(
         texture: Texture,
-        pad: int = 2
-    ) -> Texture:
+        pad: int = 2,
+    ) -> tuple[Texture, ShapeMask]:
+    """The isometric projection steps, returns the projected texture and its shape."""
     
     w, h = texture.size
     isoimg = texture.take((-pad, -pad), (w+2*pad, h+2*pad))
@@ -18,6 +26,154 @@ def convert_ort2iso(
     isoimg = isoimg.crop((pad, pad//2, w-pad, h-pad//2))
     
     isomask = ShapeMaskGen.isometric(isoimg.size)
-    return isomask.cut(isoimg)
+    return isoimg, isomask
+
+
+def _ort2hex(
+        texture: Texture,
+        top: str = "flat",
+    ) -> tuple[Texture, ShapeMask]:
+    """The hexagonal projection steps, returns the projected texture and its shape."""
+    
+    hexmask = ShapeMaskGen.hexagonal(texture.width, top)
+    heximg = texture.take((0, 0), hexmask.size)
+    
+    return heximg, hexmask
+
+
+PROJECTIONS = {
+    'isometric'      : lambda texture, pad: _ort2iso(texture, pad),
+    'hexagonal.flat' : lambda texture, pad: _ort2hex(texture, 'flat'),
+    'hexagonal.point': lambda texture, pad: _ort2hex(texture, 'point'),
+}
+
+
+
+class Remap:
+    """A precomputed projection from orthogonal Textures.
+    Stores which source pixel lands on each destination pixel,
+    so projecting is a single gather, for one Texture or a whole stack.
+    """
+    
+    # DUNDERS # ---------------------------------------------------------------
+    def __init__(self,
+            size: tuple[int, int],
+            projection: Shape,
+            pad: int = 2,
+        ) -> None:
+        
+        assert projection in PROJECTIONS, f"Unknown projection: {projection}"
+        
+        self.projection: Shape = projection
+        self.source_size: tuple[int, int] = size
+        
+        # Runs the projection over the pixel coordinates instead of colors
+        w, h = size
+        coords = np.arange(w * h, dtype=np.uint32).reshape(h, w)
+        encoded = np.stack((coords >> 16, coords >> 8, coords), axis=-1) & 0xFF
+        
+        projected, mask = PROJECTIONS[projection](Texture(encoded.astype(np.uint8)), pad)
+        
+        # Pixels filled by the rotation are black in a white texture
+        white = Texture(np.full((h, w, 3), 255, np.uint8))
+        valid, _ = PROJECTIONS[projection](white, pad)
+        
+        decoded = projected.as_array.astype(np.int64)
+        index = (decoded[..., 0] << 16) | (decoded[..., 1] << 8) | decoded[..., 2]
+        index[valid.as_array[..., 0] == 0] = -1
+        
+        self.index: np.typing.NDArray = index
+        self.alpha: np.typing.NDArray = mask.as_array
+        self.shape: ShapeMask = mask
+    
+    def __str__(self) -> str:
+        return f"REMAP | {self.projection} from:{self.source_size} to:{self.size}"
+    
+    # PROPERTIES # ------------------------------------------------------------
+    @property
+    def size(self) -> tuple[int, int]:
+        return self.index.shape[1], self.index.shape[0]
+    
+    # METHODS # ---------------------------------------------------------------
+    def apply_array(self,
+            array: np.typing.NDArray,
+        ) -> np.typing.NDArray:
+        """Projects RGB arrays shaped (..., h, w, 3) into RGBA (..., H, W, 4)."""
+        
+        w, h = self.source_size
+        assert array.shape[-3:-1] == (h, w), \
+            f"Expected textures of size {self.source_size}"
+        
+        flat = array.reshape(*array.shape[:-3], h * w, 3)
+        rgb = flat[..., np.maximum(self.index, 0), :]
+        rgb[..., self.index < 0, :] = 0
+        
+        alpha = np.broadcast_to(self.alpha[..., None], rgb.shape[:-1] + (1,))
+        
+        return np.concatenate((rgb, alpha), axis=-1)
+    
+    def apply(self,
+            texture: Texture,
+        ) -> Image.Image:
+        """Projects a single Texture. Returns an RGBA Image."""
+        
+        return Image.fromarray(self.apply_array(texture.as_array), 'RGBA')
+    
+    def apply_stack(self,
+            stack: TextureStack,
+        ) -> np.typing.NDArray:
+        """Projects every Texture of the stack. Returns a (N, H, W, 4) array."""
+        
+        return self.apply_array(stack.array)
+
 
 
+REMAPS = MemoryCache(32)
+
+
+def get_remap(
+        size: tuple[int, int],
+        projection: Shape,
+        pad: int = 2,
+    ) -> Remap:
+    """Returns the cached `Remap`, building it on the first call."""
+    
+    key = (tuple(size), projection, pad)
+    
+    remap = REMAPS.get(key)
+    if remap is None:
+        remap = Remap(size, projection, pad)
+        REMAPS.put(key, remap)
+    
+    return remap
+
+
+def convert(
+        texture: Texture | TextureStack,
+        projection: Shape,
+        pad: int = 2,
+    ) -> Image.Image | np.typing.NDArray:
+    """Projects an orthogonal Texture (Image) or TextureStack (RGBA array)."""
+    
+    remap = get_remap(texture.size, projection, pad)
+    
+    if isinstance(texture, TextureStack):
+        return remap.apply_stack(texture)
+    
+    return remap.apply(texture)
+
+
+def convert_ort2iso(
+        texture: Texture,
+        pad: int = 2
+    ) -> Image.Image:
+    
+    return convert(texture, 'isometric', pad)
+
+
+def convert_ort2hex(
+        texture: Texture,
+        top: str = "flat",
+    ) -> Image.Image:
+    
+    return convert(texture, f'hexagonal.{top}')
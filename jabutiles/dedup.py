@@ -0,0 +1,133 @@
+"""Keeps a single copy of each distinct rendered image.
+
+Many tiles (e.g. edge combinations equal by symmetry) render to identical pixels.
+A `DedupStore` maps every logical tile id to the content hash of its image,
+and stores each distinct image once:
+
+```
+store = DedupStore()
+for edges, tile in tiles.items():
+    store.add(edges, tile)
+
+print(store)                    # DEDUPSTORE | ids:256 unique:47
+store.export('out/', 'png')     # 47 images plus an index of the 256 ids
+```
+"""
+
+import os
+import json
+from typing import Any, Hashable, Iterator
+
+from PIL import Image
+
+from jabutiles.base import BaseImage
+from jabutiles.export import export_many
+from jabutiles.tile import Tile
+from jabutiles.utils_img import image_digest
+
+
+
+class DedupStore:
+    """Maps tile ids to unique pixel payloads, by content hash."""
+    
+    # DUNDERS # ---------------------------------------------------------------
+    def __init__(self) -> None:
+        self._digests: dict[Hashable, str] = {}
+        self._images: dict[str, Image.Image] = {}
+    
+    def __str__(self) -> str:
+        return f"DEDUPSTORE | ids:{len(self)} unique:{self.unique}"
+    
+    def __len__(self) -> int:
+        return len(self._digests)
+    
+    def __contains__(self, tile_id: Hashable) -> bool:
+        return tile_id in self._digests
+    
+    def __getitem__(self, tile_id: Hashable) -> Image.Image:
+        return self._images[self._digests[tile_id]]
+    
+    # PROPERTIES # ------------------------------------------------------------
+    @property
+    def unique(self) -> int:
+        """How many distinct images are stored."""
+        
+        return len(self._images)
+    
+    @property
+    def saved(self) -> int:
+        """Bytes of raw pixels not stored thanks to deduplication."""
+        
+        total = sum(_nbytes(self._images[digest]) for digest in self._digests.values())
+        
+        return total - sum(_nbytes(image) for image in self._images.values())
+    
+    # METHODS # ---------------------------------------------------------------
+    def add(self,
+            tile_id: Hashable,
+            tile: Tile | BaseImage | Image.Image,
+        ) -> str:
+        """Stores the image of `tile` under `tile_id`, unless an identical one exists.
+        Returns its digest."""
+        
+        if isinstance(tile, Tile):
+            image, digest = tile.image, tile.digest
+        
+        else:
+            image = tile.image if isinstance(tile, BaseImage) else tile
+            digest = image_digest(image)
+        
+        self._digests[tile_id] = digest
+        self._images.setdefault(digest, image)
+        
+        return digest
+    
+    def digest(self,
+            tile_id: Hashable,
+        ) -> str:
+        return self._digests[tile_id]
+    
+    def aliases(self,
+            digest: str,
+        ) -> list[Hashable]:
+        """Every tile id sharing the image `digest`."""
+        
+        return [tile_id for tile_id, other in self._digests.items() if other == digest]
+    
+    def items(self) -> Iterator[tuple[Hashable, Image.Image]]:
+        """Every (tile id, image), identical images being the same object."""
+        
+        for tile_id, digest in self._digests.items():
+            yield tile_id, self._images[digest]
+    
+    def images(self) -> Iterator[tuple[str, Image.Image]]:
+        """Every distinct (digest, image)."""
+        
+        yield from self._images.items()
+    
+    def export(self,
+            folder: str,
+            ext: str = 'png',
+            workers: int = None,
+            **params,
+        ) -> dict[str, Any]:
+        """Writes each distinct image once, named by its digest,
+        plus an `index.json` mapping the tile ids to the files.
+        The `params` are passed to `export.export_many`."""
+        
+        os.makedirs(folder, exist_ok=True)
+        
+        export_many(
+            ((os.path.join(folder, f"{digest}.{ext}"), image) for digest, image in self._images.items()),
+            workers=workers, **params)
+        
+        index = {str(tile_id): f"{digest}.{ext}" for tile_id, digest in self._digests.items()}
+        
+        with open(os.path.join(folder, 'index.json'), 'w') as file:
+            json.dump(index, file, indent=1)
+        
+        return index
+
+
+def _nbytes(image: Image.Image) -> int:
+    return image.width * image.height * len(image.getbands())
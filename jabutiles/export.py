@@ -0,0 +1,252 @@
+"""Writes images to files: many at once, or too large to be held in memory at once.
+
+`export_many` encodes across a thread pool, Pillow releasing the GIL while compressing:
+
+```
+export_many({f'out/{name}.png': tile for name, tile in tiles.items()}, compress_level=1)
+export_many(pairs, format='npy')    # raw arrays, for intermediate artifacts
+```
+"""
+
+import os
+import zlib
+import struct
+from typing import Any, BinaryIO, Iterable, Mapping
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+
+
+class PNGStreamWriter:
+    """Writes a PNG by bands of rows, so the whole image never exists in memory.
+    
+    ```
+    with PNGStreamWriter('map.png', (width, height)) as png:
+        for band in bands:          # (rows, width, 4) arrays, top to bottom
+            png.write_rows(band)
+    ```
+    
+    Each row is stored with the PNG 'Up' filter (difference to the row above),
+    which compresses repeated tiles well and is cheap to compute.
+    """
+    
+    SIGNATURE = b'\x89PNG\r\n\x1a\n'
+    
+    # PNG color types by number of channels (L, LA, RGB, RGBA)
+    COLOR_TYPES = {1: 0, 2: 4, 3: 2, 4: 6}
+    
+    # DUNDERS # ---------------------------------------------------------------
+    def __init__(self,
+            path: str,
+            size: tuple[int, int],
+            channels: int = 4,
+            compress_level: int = 6,
+            chunk_size: int = 1 << 20,
+        ) -> None:
+        
+        assert channels in PNGStreamWriter.COLOR_TYPES, f"Unsupported channels: {channels}"
+        
+        self.size: tuple[int, int] = size
+        self.channels: int = channels
+        self.rows: int = 0
+        
+        self._file: BinaryIO = open(path, 'wb')
+        self._zip = zlib.compressobj(compress_level)
+        self._buffer: bytearray = bytearray()
+        self._chunk_size: int = chunk_size
+        self._previous: np.typing.NDArray = np.zeros(size[0] * channels, np.uint8)
+        
+        header = struct.pack('>IIBBBBB',
+            size[0], size[1], 8, PNGStreamWriter.COLOR_TYPES[channels], 0, 0, 0)
+        
+        self._file.write(PNGStreamWriter.SIGNATURE)
+        self._write_chunk(b'IHDR', header)
+    
+    def __str__(self) -> str:
+        return f"PNGSTREAMWRITER | size:{self.size} rows:{self.rows}"
+    
+    def __enter__(self) -> "PNGStreamWriter":
+        return self
+    
+    def __exit__(self, *exc) -> None:
+        # On errors the partial file is dropped, without masking the error
+        if exc[0] is not None:
+            self.discard()
+        else:
+            self.close()
+    
+    # METHODS # ---------------------------------------------------------------
+    def write_rows(self,
+            rows: np.typing.NDArray,
+        ) -> None:
+        """Appends uint8 rows shaped (rows, width) or (rows, width, channels)."""
+        
+        W, H = self.size
+        rows = rows.reshape(len(rows), -1)
+        
+        assert rows.shape[1] == W * self.channels, \
+            f"Expected rows of {W} pixels with {self.channels} channels"
+        assert self.rows + len(rows) <= H, "More rows than the image height"
+        
+        # 'Up' filter, each row minus the one above (uint8 wraps around)
+        previous = np.concatenate((self._previous[None], rows[:-1]))
+        filtered = rows - previous
+        
+        lines = np.empty((len(rows), rows.shape[1] + 1), np.uint8)
+        lines[:, 0] = 2
+        lines[:, 1:] = filtered
+        
+        self._buffer += self._zip.compress(lines.tobytes())
+        self._previous = rows[-1].copy()
+        self.rows += len(rows)
+        
+        if len(self._buffer) >= self._chunk_size:
+            self._flush()
+    
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        
+        complete = self.rows == self.size[1]
+        if not complete:
+            self.discard()
+        
+        assert complete, f"Only {self.rows} of {self.size[1]} rows were written"
+        
+        self._buffer += self._zip.flush()
+        self._flush()
+        self._write_chunk(b'IEND', b'')
+        self._file.close()
+    
+    def discard(self) -> None:
+        """Closes and removes the unfinished file."""
+        
+        if self._file.closed:
+            return
+        
+        self._file.close()
+        
+        if os.path.exists(self._file.name):
+            os.remove(self._file.name)
+    
+    def _flush(self) -> None:
+        if self._buffer:
+            self._write_chunk(b'IDAT', bytes(self._buffer))
+            self._buffer.clear()
+    
+    def _write_chunk(self,
+            kind: bytes,
+            data: bytes,
+        ) -> None:
+        
+        self._file.write(struct.pack('>I', len(data)))
+        self._file.write(kind)
+        self._file.write(data)
+        self._file.write(struct.pack('>I', zlib.crc32(kind + data)))
+
+
+
+def as_image(image: Any) -> Image.Image:
+    """The PIL Image of a Tile, BaseImage, Image or uint8 array."""
+    
+    if isinstance(image, Image.Image):
+        return image
+    
+    if isinstance(image, np.ndarray):
+        return Image.fromarray(image)
+    
+    return image.image
+
+
+
+def save_image(
+        image: Any,
+        path: str,
+        format: str = None,
+        compress_level: int = 6,
+        optimize: bool = False,
+        **params,
+    ) -> str:
+    """Saves a Tile, BaseImage, Image or array.
+    
+    Args:
+        format: Pillow's format name or an extension, or 'npy' for the raw array. Defaults to the path extension.
+        compress_level: PNG zlib level, 0 (no compression, fastest) to 9.
+        optimize: lets the encoder search for a smaller file, much slower.
+        params: passed through to `Image.save`.
+    
+    Returns:
+        The path written.
+    """
+    
+    if format is None:
+        format = os.path.splitext(path)[1][1:] or 'png'
+    
+    if format.lower() == 'npy':
+        array = image if isinstance(image, np.ndarray) else np.asarray(as_image(image))
+        np.save(path, array)
+        return path
+    
+    image = as_image(image)
+    
+    # Extensions such as 'jpg' or 'tif' aren't Pillow's format names
+    format = Image.registered_extensions().get(f".{format.lower()}", format.upper())
+    
+    if format == 'PNG':
+        params = {'compress_level': compress_level, 'optimize': optimize} | params
+    elif optimize:
+        params = {'optimize': True} | params
+    
+    # JPEG has no alpha channel
+    if format == 'JPEG' and image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGB')
+    
+    image.save(path, format=format, **params)
+    
+    return path
+
+
+
+def export_many(
+        items: Mapping[str, Any] | Iterable[tuple[str, Any]],
+        format: str = None,
+        compress_level: int = 6,
+        optimize: bool = False,
+        workers: int = None,
+        **params,
+    ) -> list[str]:
+    """Saves many images, encoding them across `workers` threads (default: one per CPU).
+    
+    Args:
+        items: {path: image} or (path, image) pairs, which may be lazily generated.
+        format, compress_level, optimize, params: as in `save_image`.
+    
+    Returns:
+        The paths written, in order.
+    """
+    
+    if isinstance(items, Mapping):
+        items = items.items()
+    
+    workers = workers or os.cpu_count() or 1
+    options = dict(format=format, compress_level=compress_level, optimize=optimize, **params)
+    
+    if workers == 1:
+        return [save_image(image, path, **options) for path, image in items]
+    
+    # Bounds the queued images, so a lazy source is not fully held in memory
+    paths: list[str] = []
+    pending: list[Future] = []
+    
+    with ThreadPoolExecutor(workers) as pool:
+        for path, image in items:
+            if len(pending) >= 2 * workers:
+                paths.append(pending.pop(0).result())
+            
+            pending.append(pool.submit(save_image, image, path, **options))
+        
+        paths.extend(future.result() for future in pending)
+    
+    return paths
@@ -0,0 +1,109 @@
+"""Shares a single instance between equal Textures, Masks and Shades.
+
+Large tilesets build the same texture, mask or shade many times over,
+each copy holding its own pixel buffer. Interning resolves every equal object
+to the first one seen, while any of them is still in use:
+
+```
+tiles = [FLYWEIGHTS.tile(tile) for tile in tiles]
+print(FLYWEIGHTS)               # FLYWEIGHTPOOL | alive:84 hits:1916
+```
+
+Interned objects are shared, so treat them as read-only.
+"""
+
+import threading
+import weakref
+from typing import Hashable, TypeVar
+
+from jabutiles.mask import Mask, ShapeMask, EdgeMask
+from jabutiles.tile import Tile
+from jabutiles.layer import Layer
+from jabutiles.shade import Shade
+from jabutiles.texture import Texture
+from jabutiles.utils_img import image_digest
+
+
+
+T = TypeVar('T', Texture, Mask, Shade)
+
+
+class FlyweightPool:
+    """Weakly keeps one instance per distinct value, safe to share between threads."""
+    
+    # DUNDERS # ---------------------------------------------------------------
+    def __init__(self) -> None:
+        self._pool: weakref.WeakValueDictionary[Hashable, object] = weakref.WeakValueDictionary()
+        self._lock: threading.Lock = threading.Lock()
+        self.hits: int = 0
+    
+    def __str__(self) -> str:
+        return f"FLYWEIGHTPOOL | alive:{len(self)} hits:{self.hits}"
+    
+    def __len__(self) -> int:
+        return len(self._pool)
+    
+    # METHODS # ---------------------------------------------------------------
+    @staticmethod
+    def key(obj: Texture | Mask | Shade) -> Hashable:
+        """What makes two objects equal: the class plus its pixels or parameters."""
+        
+        if isinstance(obj, Shade):
+            return Shade, (obj.force, obj.offset, obj.border, obj.outline, obj.dist, obj.inverted, obj.seed)
+        
+        assert isinstance(obj, (Texture, Mask)), f"Cannot intern {type(obj).__name__}"
+        
+        params = ()
+        if isinstance(obj, ShapeMask):
+            params = (obj.shape, obj.edges if isinstance(obj, EdgeMask) else None)
+        
+        return type(obj), params, image_digest(obj.image)
+    
+    def intern(self,
+            obj: T,
+        ) -> T:
+        """The shared instance equal to `obj`, which becomes it if there is none."""
+        
+        if obj is None:
+            return None
+        
+        key = FlyweightPool.key(obj)
+        
+        with self._lock:
+            shared = self._pool.get(key)
+            
+            if shared is None:
+                self._pool[key] = shared = obj
+            elif shared is not obj:
+                self.hits += 1
+        
+        return shared
+    
+    def layer(self,
+            layer: Layer,
+        ) -> Layer:
+        """The `layer` with its texture, mask and shades interned."""
+        
+        return Layer(
+            self.intern(layer.texture),
+            self.intern(layer.mask),
+            self.intern(layer.on_self),
+            self.intern(layer.on_other),
+        )
+    
+    def tile(self,
+            tile: Tile,
+        ) -> Tile:
+        """The `tile` with all of its layers interned."""
+        
+        return Tile([self.layer(layer) for layer in tile._layers])
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._pool.clear()
+            self.hits = 0
+
+
+
+# The pool of the process
+FLYWEIGHTS = FlyweightPool()
@@ -1,3 +1,4 @@
+import random as rnd
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from jabutiles.mask import Mask
@@ -14,6 +15,8 @@ from jabutiles.utils_img import cut_image
 class Layer:
     """"""
     
+    __slots__ = ('texture', 'mask', 'on_self', 'on_other', '__weakref__')
+    
     # DUNDERS # ---------------------------------------------------------------
     def __init__(self,
             texture: "Texture" = None,
@@ -97,3 +100,29 @@ class Layer:
     @property
     def as_texture(self) -> "Texture":
         return Texture(self.image)
+    
+    # METHODS # ---------------------------------------------------------------
+    def paste_on(self,
+            image: Image.Image,
+            rng: rnd.Random = None,
+        ) -> None:
+        """Pastes the Layer over the `image`, in place.  
+        Only the region inside the mask's bounding box is processed.  
+        The `rng` is passed to the shade (see `Shade.apply`)."""
+        
+        if self.mask.is_empty:
+            return
+        
+        box = self.mask.bbox
+        
+        # A mask-only layer pastes the mask itself, as its image does
+        if self.texture is None:
+            source = self.mask.image
+        
+        elif self.on_self is not None:
+            source = self.on_self.stamp(self.texture, self.mask, rng).image
+        
+        else:
+            source = self.texture.image
+        
+        image.paste(source.crop(box), box[:2], self.mask.image.crop(box))
@@ -0,0 +1,118 @@
+"""Loads images from disk, decoding each file only once.
+
+Decoded images are kept in a process-wide cache, keyed by path, modification time and mode,
+so building thousands of Textures from the same files decodes each of them once:
+
+```
+Texture('examples/grass.png')                   # decodes
+Texture('examples/grass.png')                   # copies the decoded image
+Texture('examples/grass.png', sidecar=True)     # also writes 'grass.png.RGB.npy'
+```
+
+With `sidecar`, the decoded pixels are also saved as a `.npy` next to the file,
+read back memory-mapped by the next processes instead of decoding the image again.
+A sidecar older than its image is ignored and rewritten.
+Each load returns its own copy, so changing it never reaches the cache.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+from jabutiles.cache import MemoryCache
+from jabutiles.utils_img import map_array
+
+
+
+# Decoded images of this process, by (path, mtime, size, mode)
+DECODED = MemoryCache(256)
+
+
+def sidecar_path(
+        path: str,
+        mode: str,
+    ) -> str:
+    return f"{path}.{mode}.npy"
+
+
+def load_image(
+        path: str,
+        mode: str = None,
+        sidecar: bool = False,
+    ) -> Image.Image:
+    """A copy of the decoded image at `path`, converted to `mode` (default: the file's own).
+    
+    Args:
+        path: the image file.
+        mode: the PIL mode to convert to.
+        sidecar: reads (or writes) the decoded pixels from a `.npy` next to the file, needs a `mode`.
+    """
+    
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, mode)
+    
+    image = DECODED.get(key)
+    if image is not None:
+        return image.copy()
+    
+    image = _read_sidecar(path, mode, stat.st_mtime_ns) if sidecar and mode else None
+    
+    if image is None:
+        with Image.open(path) as file:
+            image = file.convert(mode) if mode and file.mode != mode else file.copy()
+        
+        if sidecar and mode:
+            _write_sidecar(sidecar_path(path, mode), image)
+    
+    DECODED.put(key, image)
+    
+    return image.copy()
+
+
+def _read_sidecar(
+        path: str,
+        mode: str,
+        mtime: int,
+    ) -> Image.Image | None:
+    """The sidecar image, if it exists and is newer than the image itself."""
+    
+    filename = sidecar_path(path, mode)
+    
+    try:
+        if os.stat(filename).st_mtime_ns < mtime:
+            return None
+        
+        array = np.load(filename, mmap_mode='r')
+    
+    except (FileNotFoundError, ValueError, EOFError):
+        return None
+    
+    image = map_array(array)
+    
+    return image if image.mode == mode else image.convert(mode)
+
+
+def _write_sidecar(
+        filename: str,
+        image: Image.Image,
+    ) -> None:
+    """Writes to a temporary file first, so concurrent readers never see half a sidecar."""
+    
+    try:
+        handle, temp = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(filename) or '.')
+    
+    except OSError:
+        # A read-only folder only loses the sidecar
+        return
+    
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            np.save(file, np.asarray(image))
+        
+        os.replace(temp, filename)
+    
+    except OSError:
+        if os.path.exists(temp):
+            os.remove(temp)
@@ -1,6 +1,7 @@
-from typing import Self, TYPE_CHECKING
+from typing import Self, Literal, TYPE_CHECKING
 if TYPE_CHECKING:
     from jabutiles.texture import Texture
+    from jabutiles.compact import PackedMask
 
 from PIL import Image, ImageOps
 
@@ -14,9 +15,16 @@ from jabutiles.utils_img import cut_image
 
 
 
+# Marks a bounding box that was not computed yet (None means empty)
+UNKNOWN = object()
+
+
+
 class Mask(BaseImage["Mask"]):
     """A Mask is a greyscale alpha image"""
     
+    __slots__ = ('_bbox',)
+    
     # DUNDERS # ---------------------------------------------------------------
     def __init__(self,
             image: ImageSource = None,
@@ -24,16 +32,36 @@ class Mask(BaseImage["Mask"]):
         ) -> None:
         
         params.setdefault("builder", Mask)
+        params.setdefault("mode", 'L')
         super().__init__(image, **params)
         
         # Ensures all masks are Luminance channel only
-        self._image: Image.Image = self._image.convert('L')
+        if self._image.mode != 'L':
+            self._image: Image.Image = self._image.convert('L')
+        
+        # Bounding box of the non-zero pixels, computed on demand
+        self._bbox: tuple[int, int, int, int] | None = params.get("bbox", UNKNOWN)
         
         # print("Mask.__init__")
     
     def __str__(self) -> str:
         return f"MASK | size:{self.size} mode:{self.mode}"
     
+    # PROPERTIES # ------------------------------------------------------------
+    @property
+    def bbox(self) -> tuple[int, int, int, int] | None:
+        """The (left, top, right, bottom) box around the non-zero pixels.  
+        None if the mask is empty. Computed once, as masks are never changed."""
+        
+        if self._bbox is UNKNOWN:
+            self._bbox = self._image.getbbox()
+        
+        return self._bbox
+    
+    @property
+    def is_empty(self) -> bool:
+        return self.bbox is None
+    
     # METHODS # ---------------------------------------------------------------
     # BASIC INTERFACES
     def copy_with_params(self,
@@ -41,9 +69,41 @@ class Mask(BaseImage["Mask"]):
         ) -> Self:
         """Returns a deep copy but keeping the original parameters."""
         
-        params = dict(builder=self._builder)
+        params = dict(builder=self._builder, share=True)
         return self._builder(image, **params)
     
+    # BASIC OPERATIONS
+    def offset(self,
+            offset: int | tuple[int, int],
+            how: Literal[None, 'wrap', 'bleed'] = None,
+        ) -> Self:
+        """'Slides' the mask by the offset amount.  
+        Without wrapping or bleeding, only the bounding box is moved."""
+        
+        if how is not None:
+            return super().offset(offset, how)
+        
+        if isinstance(offset, int):
+            offset = offset, offset
+        
+        image = Image.new(self.mode, self.size, 0)
+        
+        if self.is_empty:
+            return self.copy_with_params(image)
+        
+        x0, y0, x1, y1 = self.bbox
+        offx, offy = offset
+        image.paste(self._image.crop(self.bbox), (x0 + offx, y0 + offy))
+        
+        result = self.copy_with_params(image)
+        
+        # The moved box, limited to the mask area
+        W, H = self.size
+        box = max(0, x0 + offx), max(0, y0 + offy), min(W, x1 + offx), min(H, y1 + offy)
+        result._bbox = box if box[0] < box[2] and box[1] < box[3] else None
+        
+        return result
+    
     # EXPANDED OPERATIONS
     def invert(self) -> Self:
         """'invert' as in 'negative'"""
@@ -76,12 +136,24 @@ class Mask(BaseImage["Mask"]):
         """Uses the mask to cut the texture. Returns an Image."""
         
         return cut_image(texture.image, self.image)
+    
+    def packed(self,
+            threshold: int = None,
+        ) -> "PackedMask":
+        """Returns a compact copy, with one bit per pixel.  
+        Without a `threshold`, the mask must be binary (0 or 255)."""
+        
+        from jabutiles.compact import PackedMask
+        
+        return PackedMask.from_mask(self, threshold)
 
 
 
 class ShapeMask(Mask):
     """A ShapeMask is a greyscale alpha image for defining Tile shapes"""
     
+    __slots__ = ('_shape',)
+    
     # DUNDERS # ---------------------------------------------------------------
     def __init__(self,
             image: ImageSource = None,
@@ -110,7 +182,7 @@ class ShapeMask(Mask):
         ) -> Self:
         """Returns a deep copy but keeping the original parameters."""
         
-        params = dict(builder=self._builder, shape=self.shape)
+        params = dict(builder=self._builder, shape=self.shape, share=True)
         
         return self._builder(image, **params)
     
@@ -138,8 +210,8 @@ class ShapeMask(Mask):
             expand: bool = True,
         ) -> Self:
         
+        # Angles not supported by the shape leave it as is
         if not self.can_rotate(angle):
-            print(f"No rotation")
             return self
         
         return super().rotate(angle, expand)
@@ -149,7 +221,6 @@ class ShapeMask(Mask):
         ) -> Self:
         
         if not self.can_reflect(axis):
-            print(f"No reflection")
             return self
         
         return super().reflect(axis)
@@ -159,6 +230,8 @@ class ShapeMask(Mask):
 class EdgeMask(ShapeMask):
     """An EdgeMask is a greyscale alpha image for border interaction"""
     
+    __slots__ = ('_edges',)
+    
     # DUNDERS # ---------------------------------------------------------------
     def __init__(self,
             image: ImageSource = None,
@@ -191,7 +264,7 @@ class EdgeMask(ShapeMask):
         ) -> Self:
         """Returns a deep copy but keeping the original parameters."""
         
-        params = dict(builder=self._builder, shape=self.shape, edges=self.edges)
+        params = dict(builder=self._builder, shape=self.shape, edges=self.edges, share=True)
         
         return self._builder(image, **params)
     
@@ -204,7 +277,7 @@ class EdgeMask(ShapeMask):
         if not self.can_rotate(angle):
             return self
         
-        params = SHAPE_EDGE_INFO[self.shape]["rotation"]
+        params = SHAPE_EDGE_INFO[self.shape]["rotation"][angle]
         
         result = super().rotate(angle, expand)
         result._edges = shift_string(self.edges, *params)
@@ -218,7 +291,7 @@ class EdgeMask(ShapeMask):
         if not self.can_reflect(axis):
             return self
         
-        params = SHAPE_EDGE_INFO[self.shape]["reflection"]
+        params = SHAPE_EDGE_INFO[self.shape]["reflection"][axis]
         
         result = super().reflect(axis)
         result._edges = shift_string(self._edges, *params)
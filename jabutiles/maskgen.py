@@ -6,6 +6,7 @@ import numpy as np
 from PIL import Image, ImageOps, ImageDraw
 
 from jabutiles.mask import Mask, ShapeMask, EdgeMask
+from jabutiles.configs import Shape
 from jabutiles.utils import snap
 from jabutiles.utils_img import make_symmetrical_outline, fanout
 
@@ -16,11 +17,15 @@ class MaskGen:
     def noise(
             size: int | tuple[int, int],
             vrange: tuple[int, int],
+            rng: np.random.Generator = None,
         ) -> Mask:
-        """ Generates a random noise Mask Tile"""
+        """ Generates a random noise Mask Tile.  
+        Uses the global numpy random state unless a `rng` is given. """
+        
+        randint = np.random.randint if rng is None else rng.integers
         
         image = Image.fromarray(np.stack(
-            np.random.randint(vrange[0], vrange[1], size, dtype=np.uint8), axis=-1), 'L')
+            randint(vrange[0], vrange[1], size, dtype=np.uint8), axis=-1), 'L')
         
         return Mask(image)
     
@@ -183,6 +188,26 @@ class MaskGen:
 
 
 class ShapeMaskGen:
+    @staticmethod
+    def from_shape(
+            shape: Shape,
+            size: tuple[int, int],
+        ) -> ShapeMask:
+        """Generates the ShapeMask of `shape` with exactly the given (width, height)."""
+        
+        match shape:
+            case 'orthogonal':
+                return ShapeMaskGen.orthogonal(size)
+            case 'isometric':
+                return ShapeMaskGen.isometric(size)
+            case 'hexagonal.flat':
+                return ShapeMaskGen.hexagonal(size, 'flat')
+            case 'hexagonal.point':
+                # Pointy hexagons are built flat and rotated
+                return ShapeMaskGen.hexagonal((size[1], size[0]), 'point')
+        
+        raise ValueError(f"Unknown shape: {shape}")
+    
     @staticmethod
     def orthogonal(
             size: int | tuple[int, int],
@@ -0,0 +1,193 @@
+"""Mip levels (each half the size of the previous) for tiles, stacks and atlases.
+
+Every level is averaged from the previous one in a single pass, with premultiplied alpha
+so transparent pixels don't darken or tint their neighbours:
+
+```
+levels = pyramid(tile)                          # [32x32, 16x16, 8x8, 4x4, 2x2, 1x1] Images
+stacks = stack_pyramid(grass_variants, 3)       # 3 TextureStacks
+sheets = atlas_mipmaps(sheet, rects, 4, padding=4)
+```
+
+In atlases, each tile is reduced on its own and its border is extruded into the padding,
+so neither averaging nor bilinear sampling bleeds across tiles.
+"""
+
+from typing import Any
+
+import numpy as np
+from PIL import Image
+
+from jabutiles.texture import TextureStack
+
+
+
+type Rect = tuple[int, int, int, int]
+
+
+# The 8-bit modes whose channels can be averaged
+MIP_MODES = ('L', 'LA', 'RGB', 'RGBA')
+
+
+def count_levels(
+        size: tuple[int, int],
+    ) -> int:
+    """Levels down to 1x1, counting the full size.
+    Odd sizes round up when halved, so 48 goes 48, 24, 12, 6, 3, 2, 1."""
+    
+    return (max(size) - 1).bit_length() + 1
+
+
+def downsample(
+        array: np.typing.NDArray,
+    ) -> np.typing.NDArray:
+    """Halves the (..., H, W, C) float `array` by averaging 2x2 blocks.
+    Odd sizes repeat their last row or column."""
+    
+    H, W = array.shape[-3:-1]
+    
+    if H % 2 or W % 2:
+        pad = [(0, 0)] * (array.ndim - 3) + [(0, H % 2), (0, W % 2), (0, 0)]
+        array = np.pad(array, pad, mode='edge')
+        H, W = H + H % 2, W + W % 2
+    
+    blocks = array.reshape(*array.shape[:-3], H // 2, 2, W // 2, 2, array.shape[-1])
+    
+    return blocks.mean(axis=(-4, -2))
+
+
+def mip_chain(
+        array: np.typing.NDArray,
+        levels: int = None,
+        alpha: bool = None,
+    ) -> list[np.typing.NDArray]:
+    """The mip levels of an uint8 (..., H, W, C) array, or a stack of them.
+    
+    Args:
+        levels: how many levels, counting the full size. Defaults to all, down to 1x1.
+        alpha: if the last channel is alpha. Defaults to True for LA and RGBA (2 and 4 channels).
+    """
+    
+    H, W, C = array.shape[-3:]
+    
+    levels = levels or count_levels((W, H))
+    alpha = C in (2, 4) if alpha is None else alpha
+    
+    current = array.astype(np.float32)
+    if alpha:
+        current[..., :-1] *= current[..., -1:] / 255
+    
+    chain = [array]
+    
+    for _ in range(1, levels):
+        current = downsample(current)
+        level = current.copy()
+        
+        # Back to straight alpha, fully transparent pixels staying black
+        if alpha:
+            opacity = level[..., -1:]
+            np.divide(level[..., :-1] * 255, opacity, out=level[..., :-1], where=opacity > 0)
+        
+        chain.append(np.clip(np.round(level), 0, 255).astype(np.uint8))
+    
+    return chain
+
+
+def pyramid(
+        image: Any,
+        levels: int = None,
+    ) -> list[Image.Image]:
+    """The mip levels of a Tile, BaseImage or Image, in its own mode.  
+    Palette ('P') images are averaged as RGBA, as their indices can't be."""
+    
+    if not isinstance(image, Image.Image):
+        image = image.image
+    
+    if image.mode == 'P':
+        image = image.convert('RGBA')
+    
+    assert image.mode in MIP_MODES, f"Mip levels need an 8-bit {'/'.join(MIP_MODES)} image, not {image.mode}"
+    
+    mode = image.mode
+    array = np.asarray(image)
+    
+    if array.ndim == 2:
+        array = array[..., None]
+    
+    chain = mip_chain(array, levels)
+    
+    return [Image.fromarray(level[..., 0] if level.shape[-1] == 1 else level, mode) for level in chain]
+
+
+def stack_pyramid(
+        stack: TextureStack,
+        levels: int = None,
+    ) -> list[TextureStack]:
+    """The mip levels of every Texture of the stack at once."""
+    
+    return [TextureStack(level) for level in mip_chain(stack.array, levels, alpha=False)]
+
+
+def extrude(
+        sheet: np.typing.NDArray,
+        rects: list[Rect],
+        pixels: int,
+    ) -> None:
+    """Repeats the border of each (x, y, w, h) rect outwards by `pixels`, in place."""
+    
+    if pixels <= 0:
+        return
+    
+    H, W = sheet.shape[:2]
+    
+    for x, y, w, h in rects:
+        top, bottom = max(0, y - pixels), min(H, y + h + pixels)
+        left, right = max(0, x - pixels), min(W, x + w + pixels)
+        
+        sheet[top:y, x:x+w] = sheet[y, x:x+w]
+        sheet[y+h:bottom, x:x+w] = sheet[y+h-1, x:x+w]
+        
+        # Columns last, so the corners repeat the corner pixels
+        sheet[top:bottom, left:x] = sheet[top:bottom, x:x+1]
+        sheet[top:bottom, x+w:right] = sheet[top:bottom, x+w-1:x+w]
+
+
+def atlas_mipmaps(
+        sheet: np.typing.NDArray,
+        rects: list[Rect],
+        levels: int,
+        padding: int = 0,
+    ) -> list[np.typing.NDArray]:
+    """The mip levels of an atlas sheet, each tile reduced on its own.
+    
+    Args:
+        sheet: the (H, W, C) uint8 sheet.
+        rects: the (x, y, w, h) of every tile, multiples of 2 ** (levels - 1).
+        levels: how many levels, counting the full size.
+        padding: the space between tiles, half of it being filled by each tile's extruded border.
+    """
+    
+    step = 1 << (levels - 1)
+    assert all(value % step == 0 for rect in rects for value in rect), \
+        f"Tile rects must be multiples of {step} to be reduced {levels - 1} times"
+    
+    H, W, C = sheet.shape
+    sheets = [np.zeros(((H + (1 << l) - 1) >> l, (W + (1 << l) - 1) >> l, C), np.uint8) for l in range(levels)]
+    sheets[0][:] = sheet
+    
+    # Same sized tiles are reduced together, as a stack
+    groups: dict[tuple[int, int], list[Rect]] = {}
+    for rect in rects:
+        groups.setdefault(rect[2:], []).append(rect)
+    
+    for (w, h), group in groups.items():
+        tiles = np.stack([sheet[y:y+h, x:x+w] for x, y, _, _ in group])
+        
+        for l, level in enumerate(mip_chain(tiles, levels)[1:], 1):
+            for (x, y, _, _), tile in zip(group, level):
+                sheets[l][y>>l:(y>>l)+(h>>l), x>>l:(x>>l)+(w>>l)] = tile
+    
+    for l, level in enumerate(sheets):
+        extrude(level, [(x >> l, y >> l, w >> l, h >> l) for x, y, w, h in rects], (padding >> l) // 2)
+    
+    return sheets
@@ -0,0 +1,336 @@
+"""Compiles a declarative tileset spec into a deduplicated render plan.
+
+A spec is a dict (or a JSON/TOML file) of named materials, masks, shades and tiles:
+
+```
+{
+    "size": 32,
+    "shape": "orthogonal",
+    "materials": {
+        "grass": {"texture": "grass", "seed": 1},
+        "dirt":  {"texture": "dirt", "seed": 2},
+        "mud":   {"from": "dirt", "steps": [["brightness", 0.8]]},
+        "sand":  {"op": "noise", "args": [[[200, 220], [180, 200], [120, 140]]], "kwargs": {"seed": 3}},
+    },
+    "masks": {
+        "bricks": {"op": "mask.bricks", "args": [[10, 10], 2, 1]},
+        "edge":   {"op": "mask.lines", "args": [[[[0, 0], [32, 0], 8]]]},
+    },
+    "shades": {
+        "drop": {"force": 0.8, "offset": [-1, 1], "border": "wrap"},
+    },
+    "tiles": {
+        "grass": {"base": "grass"},
+        "grass_mud_n": {"base": "grass", "layers": [{"material": "mud", "mask": "edge", "on_other": "drop"}]},
+        "grass_mud_e": {"base": "grass", "layers": [{"material": "mud", "mask": {"from": "edge", "steps": [["rotate", -90]]}}]},
+    },
+}
+```
+
+Every entry becomes a `Recipe`. Generator operations receive the `size` first.
+Entries with `from` start from another entry of the same section, then apply their `steps` (method calls).
+JSON arrays are read as tuples, as in `Recipe`.
+
+Equal sub-recipes get the same digest, so the plan holds each of them a single time.
+"""
+
+import os
+import json
+import uuid
+import tomllib
+from functools import partial
+from typing import Any, Iterator
+
+from PIL import Image
+
+from jabutiles.recipe import Recipe
+from jabutiles.render import render_tileset
+
+
+
+type Spec = dict[str, Any]
+
+
+# Nodes built by this worker process, for the current run only
+WORKER_MEMO: dict[str, dict[str, Any]] = {}
+
+
+# Shape names and their generator recipes
+SHAPE_RECIPES = {
+    'orthogonal'     : lambda size: Recipe('shape.orthogonal', size),
+    'isometric'      : lambda size: Recipe('shape.isometric', size),
+    'hexagonal.flat' : lambda size: Recipe('shape.hexagonal', size, 'flat'),
+    'hexagonal.point': lambda size: Recipe('shape.hexagonal', size, 'point'),
+}
+
+
+def load_spec(path: str) -> Spec:
+    """Reads a spec from a `.json` or `.toml` file."""
+    
+    _, ext = os.path.splitext(path)
+    
+    with open(path, 'rb') as file:
+        if ext == '.toml':
+            return tomllib.load(file)
+        
+        return json.load(file)
+
+
+def _tuples(value: Any) -> Any:
+    """Turns the JSON/TOML lists into tuples, like `Recipe.from_data`."""
+    
+    if isinstance(value, list):
+        return tuple(_tuples(item) for item in value)
+    
+    if isinstance(value, dict):
+        return {key: _tuples(item) for key, item in value.items()}
+    
+    return value
+
+
+
+class Plan:
+    """The tiles of a spec as recipes, plus their deduplicated dependency graph."""
+    
+    # DUNDERS # ---------------------------------------------------------------
+    def __init__(self,
+            tiles: dict[str, Recipe],
+        ) -> None:
+        
+        self.tiles: dict[str, Recipe] = tiles
+        
+        # Unique nodes, by digest, and the digests each of them uses
+        self.nodes: dict[str, Recipe] = {}
+        self.deps: dict[str, set[str]] = {}
+        
+        # Nodes in an order where dependencies always come first
+        self.order: list[str] = []
+        
+        # How many recipes would run without deduplication
+        self.calls: int = 0
+        
+        for recipe in tiles.values():
+            self._visit(recipe)
+    
+    def __str__(self) -> str:
+        return f"PLAN | tiles:{len(self.tiles)} nodes:{len(self.nodes)} calls:{self.calls}"
+    
+    def __len__(self) -> int:
+        return len(self.nodes)
+    
+    # METHODS # ---------------------------------------------------------------
+    @staticmethod
+    def compile(spec: Spec | str) -> "Plan":
+        """Builds the Plan from a spec dict or file path."""
+        
+        if isinstance(spec, str):
+            spec = load_spec(spec)
+        
+        return Plan(_Compiler(spec).tiles())
+    
+    def run(self,
+            workers: int = 0,
+            **params,
+        ) -> Iterator[tuple[str, Image.Image]]:
+        """Renders every tile, yielding (name, Image).
+        
+        Serially (`workers=0`) each node is built once and freed when no longer needed.
+        In parallel, tiles are spread over `render_tileset`, each worker building a node
+        at most once, and keeping them all until the run ends. Other `params` go to `render_tileset`.
+        """
+        
+        if workers == 0:
+            yield from self._run_serial()
+            return
+        
+        names = list(self.tiles)
+        run = uuid.uuid4().hex
+        tasks = [partial(build_in_worker, run, self.tiles[name]) for name in names]
+        
+        for idx, image in render_tileset(tasks, workers, **params):
+            yield names[idx], image
+    
+    def _visit(self,
+            recipe: Recipe,
+        ) -> str:
+        """Adds the recipe and its sub-recipes to the graph, returns its digest."""
+        
+        self.calls += 1
+        digest = recipe.digest
+        
+        if digest in self.nodes:
+            return digest
+        
+        deps = {self._visit(child) for child in _children(recipe)}
+        
+        self.nodes[digest] = recipe
+        self.deps[digest] = deps
+        self.order.append(digest)
+        
+        return digest
+    
+    def _run_serial(self) -> Iterator[tuple[str, Image.Image]]:
+        # The same tile may be listed under many names
+        outputs: dict[str, list[str]] = {}
+        for name, recipe in self.tiles.items():
+            outputs.setdefault(recipe.digest, []).append(name)
+        
+        # How many nodes still need each result
+        pending = {digest: 0 for digest in self.nodes}
+        for deps in self.deps.values():
+            for dep in deps:
+                pending[dep] += 1
+        
+        memo: dict[str, Any] = {}
+        
+        for digest in self.order:
+            result = self.nodes[digest].build(memo)
+            
+            for dep in self.deps[digest]:
+                pending[dep] -= 1
+                if pending[dep] == 0 and dep not in outputs:
+                    memo.pop(dep)
+            
+            if digest in outputs:
+                for name in outputs[digest]:
+                    yield name, result.image
+                
+                if pending[digest] == 0:
+                    memo.pop(digest)
+
+
+
+def build_in_worker(
+        run: str,
+        recipe: Recipe,
+    ) -> Any:
+    """Builds a recipe reusing the nodes already built by this process for the same `run`.
+    The nodes of previous runs are forgotten."""
+    
+    if run not in WORKER_MEMO:
+        WORKER_MEMO.clear()
+        WORKER_MEMO[run] = {}
+    
+    return recipe.build(WORKER_MEMO[run])
+
+
+def _children(recipe: Recipe) -> Iterator[Recipe]:
+    """The Recipes used as arguments, at any depth of lists and dicts."""
+    
+    stack = [*recipe.args, *recipe.kwargs.values()]
+    
+    while stack:
+        value = stack.pop()
+        
+        if isinstance(value, Recipe):
+            yield value
+        
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+        
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+
+
+
+class _Compiler:
+    """Turns the entries of a spec into Recipes, resolving names as needed."""
+    
+    def __init__(self,
+            spec: Spec,
+        ) -> None:
+        
+        size = spec.get('size', 32)
+        if isinstance(size, int):
+            size = size, size
+        
+        self.size: tuple[int, int] = tuple(size)
+        self.shape: str | None = spec.get('shape', 'orthogonal')
+        self.spec: Spec = spec
+        
+        # Recipes already compiled, by (section, name)
+        self._done: dict[tuple[str, str], Recipe] = {}
+    
+    def tiles(self) -> dict[str, Recipe]:
+        return {name: self.tile(entry) for name, entry in self.spec.get('tiles', {}).items()}
+    
+    def tile(self,
+            entry: Spec,
+        ) -> Recipe:
+        
+        layers = []
+        
+        if 'base' in entry:
+            layers.append(Recipe('layer', self.ref('materials', entry['base'])))
+        
+        for layer in entry.get('layers', []):
+            layers.append(Recipe('layer',
+                self.ref('materials', layer.get('material')),
+                self.ref('masks', layer.get('mask')),
+                self.ref('shades', layer.get('on_self')),
+                self.ref('shades', layer.get('on_other')),
+            ))
+        
+        shape = entry.get('shape', self.shape)
+        if shape is not None:
+            assert shape in SHAPE_RECIPES, f"Unknown shape: {shape}"
+            layers.append(Recipe('layer', None, SHAPE_RECIPES[shape](self.size)))
+        
+        assert layers, "A tile needs at least one layer"
+        
+        return Recipe('tile', layers)
+    
+    def ref(self,
+            section: str,
+            value: str | Spec | None,
+        ) -> Recipe | None:
+        """Resolves a name of the `section`, or compiles an inline entry."""
+        
+        if value is None:
+            return None
+        
+        if isinstance(value, dict):
+            return self.entry(section, value)
+        
+        key = section, value
+        
+        if key not in self._done:
+            entries = self.spec.get(section, {})
+            assert value in entries, f"Unknown {section[:-1]}: {value}"
+            
+            # Marks the name, so cycles fail instead of recursing forever
+            self._done[key] = None
+            self._done[key] = self.entry(section, entries[value])
+        
+        assert self._done[key] is not None, f"Cyclic {section[:-1]}: {value}"
+        
+        return self._done[key]
+    
+    def entry(self,
+            section: str,
+            entry: Spec,
+        ) -> Recipe:
+        
+        entry = dict(entry)
+        steps = entry.pop('steps', [])
+        
+        if 'from' in entry:
+            recipe = self.ref(section, entry.pop('from'))
+        
+        elif section == 'shades':
+            recipe = Recipe('shade', **_tuples(entry))
+        
+        elif 'texture' in entry:
+            name = entry.pop('texture')
+            recipe = Recipe('texture', self.size, name, **_tuples(entry))
+        
+        else:
+            assert 'op' in entry, f"Entries need an 'op', 'texture' or 'from': {entry}"
+            args = _tuples(entry.get('args', []))
+            kwargs = _tuples(entry.get('kwargs', {}))
+            recipe = Recipe(entry['op'], self.size, *args, **kwargs)
+        
+        for method, *args in steps:
+            recipe = getattr(recipe, method)(*_tuples(args))
+        
+        return recipe
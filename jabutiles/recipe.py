@@ -0,0 +1,320 @@
+"""Describes Tiles by how to build them, instead of their pixels.
+
+A `Recipe` is a call to a registered operation, whose arguments may be other Recipes:
+
+```
+grass = Recipe('texture', 32, 'grass', seed=1)
+dirt = Recipe('texture', 32, 'dirt', seed=2).brightness(0.9)
+edge = Recipe('mask.bricks', 32, 8, 2)
+tile = Recipe('tile', [
+    Recipe('layer', grass),
+    Recipe('layer', dirt, edge, Recipe('shade', 0.8, offset=1)),
+])
+
+data = tile.to_bytes()                  # a few hundred bytes
+image = Recipe.from_bytes(data)().image # rebuilt on demand
+```
+
+Calling a method on a Recipe (`.brightness(0.9)`) records it as another step.
+The `digest` identifies the result, so it doubles as a cache key.
+Random operations only give the same result if seeded.
+`render(cache)` keeps the pixels in a `DiskCache` under the digest, across processes.
+"""
+
+import json
+import zlib
+import hashlib
+from typing import Any, Callable
+
+import numpy as np
+from PIL import Image
+
+from jabutiles.base import BaseImage
+from jabutiles.cache import DiskCache
+from jabutiles.mask import Mask
+from jabutiles.tile import Tile
+from jabutiles.layer import Layer
+from jabutiles.shade import Shade
+from jabutiles.texture import Texture, TextureGen
+from jabutiles.maskgen import MaskGen, ShapeMaskGen
+from jabutiles.utils_img import map_array
+
+
+
+class Recipe:
+    """A lazy call of a registered operation.
+    Operations starting with a dot are methods of the first argument.
+    """
+    
+    # Registered operations, as {name: (function, version)}
+    OPS: dict[str, tuple[Callable[..., Any], int | Callable[..., int]]] = {}
+    
+    # DUNDERS # ---------------------------------------------------------------
+    def __init__(self,
+            op: str,
+            *args,
+            **kwargs,
+        ) -> None:
+        
+        assert op.startswith('.') or op in Recipe.OPS, f"Unknown operation: {op}"
+        assert not op.startswith('._'), f"Private methods are not allowed: {op}"
+        
+        self.op: str = op
+        self.args: tuple = args
+        self.kwargs: dict[str, Any] = kwargs
+        
+        self._digest: str = None
+    
+    def __str__(self) -> str:
+        return f"RECIPE | op:{self.op} digest:{self.digest[:12]}"
+    
+    def __getattr__(self, name: str) -> Callable[..., "Recipe"]:
+        """Records a method call of the built object as a new Recipe."""
+        
+        # Keeps copy/pickle from looking up missing dunders here
+        if name.startswith('_'):
+            raise AttributeError(name)
+        
+        def method(*args, **kwargs) -> Recipe:
+            return Recipe(f'.{name}', self, *args, **kwargs)
+        
+        return method
+    
+    def __call__(self) -> Any:
+        return self.build()
+    
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Recipe) and self.digest == other.digest
+    
+    def __hash__(self) -> int:
+        return hash(self.digest)
+    
+    # PROPERTIES # ------------------------------------------------------------
+    @property
+    def digest(self) -> str:
+        """The sha256 of the canonical form plus the operations versions."""
+        
+        if self._digest is None:
+            data = Recipe._encode(self, versions=True)
+            text = json.dumps(data, sort_keys=True, separators=(',', ':'))
+            self._digest = hashlib.sha256(text.encode()).hexdigest()
+        
+        return self._digest
+    
+    @property
+    def version(self) -> int:
+        if self.op.startswith('.'):
+            return 0
+        
+        version = Recipe.OPS[self.op][1]
+        if callable(version):
+            return version(*self.args, **self.kwargs)
+        
+        return version
+    
+    # METHODS # ---------------------------------------------------------------
+    # REGISTRY
+    @staticmethod
+    def register(
+            name: str,
+            function: Callable[..., Any],
+            version: int | Callable[..., int] = 1,
+        ) -> None:
+        """Registers `function` as the operation `name`.
+        Bump the `version` when its output changes, so cached results expire.
+        It can also be a function of the call arguments."""
+        
+        Recipe.OPS[name] = (function, version)
+    
+    # BUILDING
+    def build(self,
+            memo: dict[str, Any] = None,
+        ) -> Any:
+        """Runs the Recipe. Sub-recipes with the same digest run only once.
+        The `memo` may be shared between builds, or be any cache with `get`/`put`."""
+        
+        if memo is None:
+            memo = {}
+        
+        result = memo.get(self.digest)
+        if result is not None:
+            return result
+        
+        args = [Recipe._build(arg, memo) for arg in self.args]
+        kwargs = {key: Recipe._build(value, memo) for key, value in self.kwargs.items()}
+        
+        if self.op.startswith('.'):
+            target, *args = args
+            result = getattr(target, self.op[1:])(*args, **kwargs)
+        else:
+            result = Recipe.OPS[self.op][0](*args, **kwargs)
+        
+        if isinstance(memo, dict):
+            memo[self.digest] = result
+        else:
+            memo.put(self.digest, result)
+        
+        return result
+    
+    def render(self,
+            cache: DiskCache = None,
+        ) -> Image.Image:
+        """Builds the Recipe into a PIL Image.
+        With a `DiskCache`, the pixels are stored by digest and later read back memory-mapped."""
+        
+        if cache is not None:
+            array = cache.get(self.digest)
+            if array is not None:
+                return map_array(array)
+        
+        result = self.build()
+        image = result.image if isinstance(result, (Tile, BaseImage)) else result
+        
+        if cache is not None:
+            cache.put(self.digest, np.asarray(image))
+        
+        return image
+    
+    @staticmethod
+    def _build(
+            value: Any,
+            memo: dict[str, Any],
+        ) -> Any:
+        
+        if isinstance(value, Recipe):
+            return value.build(memo)
+        
+        if isinstance(value, (list, tuple)):
+            return type(value)(Recipe._build(item, memo) for item in value)
+        
+        if isinstance(value, dict):
+            return {key: Recipe._build(item, memo) for key, item in value.items()}
+        
+        return value
+    
+    # SERIALIZATION
+    def to_data(self) -> dict[str, Any]:
+        """A JSON compatible form. Tuples become arrays, lists and dicts are tagged."""
+        
+        return Recipe._encode(self)
+    
+    def to_json(self) -> str:
+        return json.dumps(self.to_data(), sort_keys=True, separators=(',', ':'))
+    
+    def to_bytes(self) -> bytes:
+        return zlib.compress(self.to_json().encode(), 9)
+    
+    @staticmethod
+    def from_data(data: dict[str, Any]) -> "Recipe":
+        return Recipe._decode(data)
+    
+    @staticmethod
+    def from_json(text: str) -> "Recipe":
+        return Recipe.from_data(json.loads(text))
+    
+    @staticmethod
+    def from_bytes(data: bytes) -> "Recipe":
+        return Recipe.from_json(zlib.decompress(data).decode())
+    
+    @staticmethod
+    def _encode(
+            value: Any,
+            versions: bool = False,
+        ) -> Any:
+        
+        if isinstance(value, Recipe):
+            data = {'op': value.op}
+            if value.args:
+                data['args'] = [Recipe._encode(arg, versions) for arg in value.args]
+            if value.kwargs:
+                data['kwargs'] = {key: Recipe._encode(arg, versions) for key, arg in value.kwargs.items()}
+            if versions:
+                data['version'] = value.version
+            return data
+        
+        if isinstance(value, tuple):
+            return [Recipe._encode(item, versions) for item in value]
+        
+        if isinstance(value, list):
+            return {'list': [Recipe._encode(item, versions) for item in value]}
+        
+        if isinstance(value, dict):
+            return {'dict': {key: Recipe._encode(item, versions) for key, item in value.items()}}
+        
+        if isinstance(value, np.generic):
+            return value.item()
+        
+        assert value is None or isinstance(value, (bool, int, float, str)), \
+            f"Can't serialize {type(value).__name__} in a Recipe"
+        
+        return value
+    
+    @staticmethod
+    def _decode(value: Any) -> Any:
+        if isinstance(value, list):
+            return tuple(Recipe._decode(item) for item in value)
+        
+        if isinstance(value, dict):
+            if 'op' in value:
+                args = Recipe._decode(value.get('args', []))
+                kwargs = {key: Recipe._decode(arg) for key, arg in value.get('kwargs', {}).items()}
+                return Recipe(value['op'], *args, **kwargs)
+            
+            if 'list' in value:
+                return [Recipe._decode(item) for item in value['list']]
+            
+            return {key: Recipe._decode(item) for key, item in value['dict'].items()}
+        
+        return value
+
+
+
+# OPERATIONS # -----------------------------------------------------------------
+def seeded_noise(
+        size: int | tuple[int, int],
+        ranges: list[tuple[int, int]],
+        mode: str = 'minmax',
+        seed: int = None,
+    ) -> Texture:
+    """`TextureGen.random_rgb` with a seed instead of a generator."""
+    
+    rng = np.random.default_rng(seed) if seed is not None else None
+    
+    return TextureGen.random_rgb(size, ranges, mode, rng)
+
+
+def seeded_mask_noise(
+        size: int | tuple[int, int],
+        vrange: tuple[int, int],
+        seed: int = None,
+    ) -> Mask:
+    """`MaskGen.noise` with a seed instead of a generator."""
+    
+    rng = np.random.default_rng(seed) if seed is not None else None
+    
+    return MaskGen.noise(size, vrange, rng)
+
+
+def texture_version(
+        size: int | tuple[int, int],
+        name: str,
+        *args,
+        **kwargs,
+    ) -> int:
+    """Named textures follow the version of their registered recipe."""
+    
+    return TextureGen.RECIPES.get(name.lower(), (None, 0))[1]
+
+
+Recipe.register('texture', TextureGen.named_texture, texture_version)
+Recipe.register('noise', seeded_noise)
+Recipe.register('mask.noise', seeded_mask_noise)
+Recipe.register('mask.bricks', MaskGen.brick_pattern)
+Recipe.register('mask.lines', MaskGen.line_draw)
+Recipe.register('mask.blobs', MaskGen.blob_draw)
+Recipe.register('shape.orthogonal', ShapeMaskGen.orthogonal)
+Recipe.register('shape.isometric', ShapeMaskGen.isometric)
+Recipe.register('shape.hexagonal', ShapeMaskGen.hexagonal)
+Recipe.register('shade', Shade)
+Recipe.register('layer', Layer)
+Recipe.register('tile', Tile)
@@ -0,0 +1,173 @@
+"""Renders many Tiles in parallel.
+
+`render_tileset` uses a process pool, `render_many` a thread pool
+(cheaper to start and sharing memory, Pillow releasing the GIL on heavy operations).
+
+A tile recipe is any picklable callable (module level function, `functools.partial`)
+that returns a `Tile`, a `BaseImage` or a `PIL.Image`.
+Each task seeds `random` and `numpy.random` from its own index,
+so the results don't depend on the number of workers nor the scheduling.
+"""
+
+import os
+import random as rnd
+from typing import Any, Callable, Hashable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import numpy as np
+from PIL import Image
+
+from jabutiles.base import BaseImage
+from jabutiles.cache import MemoryCache
+from jabutiles.tile import Tile
+
+
+
+type TileRecipe = Callable[[], Tile | BaseImage | Image.Image]
+
+
+# Objects shared by the tasks of a single process (see `shared`)
+WORKER_CACHE = MemoryCache(256)
+
+
+def shared(
+        key: Hashable,
+        builder: Callable[..., Any],
+        *args,
+        **kwargs,
+    ) -> Any:
+    """Returns the object for `key`, building it only once per process.
+    Used by recipes for textures and masks shared by many tiles:
+    
+    ```
+    def grass_tile(edges):
+        base = shared('grass', TextureGen.named_texture, 32, 'grass', seed=1)
+        shape = shared('square', ShapeMaskGen.orthogonal, 32)
+        ...
+    ```
+    """
+    
+    value = WORKER_CACHE.get(key)
+    
+    if value is None:
+        value = builder(*args, **kwargs)
+        WORKER_CACHE.put(key, value)
+    
+    return value
+
+
+def task_seeds(
+        seed: int,
+        count: int,
+    ) -> list[int]:
+    """Derives `count` independent seeds from a single `seed`."""
+    
+    children = np.random.SeedSequence(seed).spawn(count)
+    
+    return [int(child.generate_state(1)[0]) for child in children]
+
+
+def render_one(
+        recipe: TileRecipe,
+        seed: int = None,
+    ) -> Image.Image:
+    """Builds and renders a single recipe, seeding the random states first.  
+    The caller's random states are restored afterwards, as it may run in the caller's process."""
+    
+    def render() -> Image.Image:
+        # Tiles render lazily, so the image too is made under the seeded states
+        result = recipe()
+        
+        if isinstance(result, (Tile, BaseImage)):
+            return result.image
+        
+        return result
+    
+    if seed is None:
+        return render()
+    
+    states = rnd.getstate(), np.random.get_state()
+    rnd.seed(seed)
+    np.random.seed(seed)
+    
+    try:
+        return render()
+    
+    finally:
+        rnd.setstate(states[0])
+        np.random.set_state(states[1])
+
+
+def _render_chunk(
+        chunk: Sequence[tuple[int, TileRecipe, int]],
+    ) -> list[tuple[int, np.typing.NDArray]]:
+    """Worker side: renders a chunk of (index, recipe, seed) tasks.
+    Returns arrays, which are cheaper to send back than Images."""
+    
+    return [(idx, np.asarray(render_one(recipe, seed))) for idx, recipe, seed in chunk]
+
+
+def render_tileset(
+        recipes: Sequence[TileRecipe],
+        workers: int = None,
+        chunksize: int = None,
+        seed: int = 0,
+        ordered: bool = True,
+    ) -> Iterator[tuple[int, Image.Image]]:
+    """Renders the `recipes` over a process pool, yielding (index, Image).
+    
+    Args:
+        recipes: picklable callables returning a Tile (or an Image).
+        workers: number of processes. Defaults to the cpu count, 0 renders in this process.
+        chunksize: tasks sent to a worker at once. Defaults to ~4 chunks per worker.
+        seed: base seed, each task gets its own derived seed.
+        ordered: yields in the recipes order, else as soon as each chunk is done.
+    """
+    
+    seeds = task_seeds(seed, len(recipes))
+    tasks = list(zip(range(len(recipes)), recipes, seeds))
+    
+    if workers == 0:
+        for idx, recipe, task_seed in tasks:
+            yield idx, render_one(recipe, task_seed)
+        return
+    
+    workers = workers or os.cpu_count() or 1
+    chunksize = chunksize or max(1, len(tasks) // (workers * 4))
+    chunks = [tasks[pos:pos+chunksize] for pos in range(0, len(tasks), chunksize)]
+    
+    with ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(_render_chunk, chunk) for chunk in chunks]
+        
+        for future in (futures if ordered else as_completed(futures)):
+            for idx, array in future.result():
+                yield idx, Image.fromarray(array)
+
+
+
+def render_many(
+        tiles: Sequence[Tile | BaseImage | TileRecipe],
+        workers: int = None,
+    ) -> list[Image.Image]:
+    """Renders the `tiles` over a thread pool, returning the Images in order.
+    
+    Args:
+        tiles: Tiles, images or recipes (called in the threads, so they need not be picklable).
+        workers: number of threads. Defaults to the cpu count, 0 renders in this thread.
+    
+    The random states are not seeded here, as they are shared by all threads:
+    recipes should draw from their own seeded generators (`rng`, `seed` parameters),
+    and outlined Shades (`dist` < 1) need a `seed`.
+    """
+    
+    def render(tile: Tile | BaseImage | TileRecipe) -> Image.Image:
+        if isinstance(tile, (Tile, BaseImage)):
+            return tile.image
+        
+        return render_one(tile)
+    
+    if workers == 0:
+        return [render(tile) for tile in tiles]
+    
+    with ThreadPoolExecutor(workers or os.cpu_count() or 1) as executor:
+        return list(executor.map(render, tiles))
@@ -1,3 +1,4 @@
+import random as rnd
 from typing import Literal
 
 from PIL import Image
@@ -8,6 +9,8 @@ from jabutiles.texture import Texture
 
 
 class Shade:
+    __slots__ = ('force', 'offset', 'border', 'outline', 'dist', 'inverted', 'seed', '__weakref__')
+    
     def __init__(self,
             force: float = 1.0,
             offset: int | tuple[int, int] = 0,
@@ -15,7 +18,10 @@ class Shade:
             outline: float = 0.0,
             dist: float = 1.0,
             inverted: bool = False,
+            seed: int = None,
         ) -> None:
+        """A `seed` makes the outline (when `dist` < 1) the same on every render,
+        and independent of the global random state shared by threads."""
         
         self.force: float = force
         self.offset: int | tuple[int, int] = offset
@@ -23,13 +29,20 @@ class Shade:
         self.outline: float = outline
         self.dist: float = dist
         self.inverted: bool = inverted
+        self.seed: int | None = seed
     
     def __str__(self) -> str:
         return f"SHADE | force:{self.force}"
     
     def apply(self,
             mask: Mask,
+            rng: rnd.Random = None,
         ) -> Mask:
+        """The shade region of the `mask`.  
+        Outlines draw from `rng`, else from a generator of the `seed`, else from `random`."""
+        
+        if rng is None and self.seed is not None:
+            rng = rnd.Random(self.seed)
         
         shade_mask: Mask = mask.copy()
         
@@ -39,7 +52,7 @@ class Shade:
             shade_mask = shade_mask.invert()
         
         if self.outline > 0.0:
-            shade_mask = shade_mask.outline(self.outline, dist=self.dist)
+            shade_mask = shade_mask.outline(self.outline, dist=self.dist, rng=rng)
         
         if self.offset:
             shade_mask = shade_mask.offset(self.offset, self.border)
@@ -52,11 +65,21 @@ class Shade:
     def stamp(self,
             texture: Texture,
             mask: Mask,
+            rng: rnd.Random = None,
         ) -> Texture:
         
-        shaded_texture = texture.brightness(self.force)
-        shaded_mask = self.apply(mask)
+        shaded_mask = self.apply(mask, rng)
+        
+        # Only the region under the shade needs to change brightness
+        if shaded_mask.is_empty:
+            return texture
+        
+        box = shaded_mask.bbox
+        shaded_texture = texture.crop(box).brightness(self.force)
+        
+        image = texture.image.copy()
+        image.paste(shaded_texture.image, box[:2], shaded_mask.image.crop(box))
         
-        return texture.combine(shaded_texture, shaded_mask)
+        return texture.copy_with_params(image)
 
 
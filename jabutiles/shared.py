@@ -0,0 +1,230 @@
+"""Shares Textures and Masks between processes without pickling them.
+
+The owner process publishes each image once into a shared memory block
+and sends only its small `SharedHandle` to the workers.
+Workers `attach` the handle, mapping the block as a read-only array:
+
+```
+with SharedPool() as pool:
+    grass = pool.publish('grass', TextureGen.named_texture(32, 'grass', seed=1))
+    square = pool.publish('square', ShapeMaskGen.orthogonal(32))
+    recipes = [partial(grass_tile, grass, square, edges) for edges in ...]
+    tiles = dict(render_tileset(recipes))
+```
+
+Masks ('L') are wrapped without copying.
+PIL stores RGB pixels with 4 bytes, so Textures are copied once per worker.
+"""
+
+import os
+import weakref
+from typing import Hashable
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from jabutiles.base import BaseImage
+from jabutiles.utils_img import map_array
+
+
+
+# Images already attached by this process, by block name
+ATTACHED: dict[str, tuple[shared_memory.SharedMemory, BaseImage]] = {}
+
+
+class SharedHandle:
+    """A picklable reference to an image in shared memory."""
+    
+    # DUNDERS # ---------------------------------------------------------------
+    def __init__(self,
+            name: str,
+            shape: tuple[int, ...],
+            builder: type = BaseImage,
+            params: dict = None,
+        ) -> None:
+        """`shape` is the array shape, `params` are passed to the `builder`."""
+        
+        self.name: str = name
+        self.shape: tuple[int, ...] = shape
+        self.builder: type = builder
+        self.params: dict = params or {}
+    
+    def __str__(self) -> str:
+        return f"SHAREDHANDLE | name:{self.name} shape:{self.shape} type:{self.builder.__name__}"
+    
+    # PROPERTIES # ------------------------------------------------------------
+    @property
+    def array(self) -> np.typing.NDArray:
+        """A read-only view of the shared pixels."""
+        
+        self.attach()
+        block, _ = ATTACHED[self.name]
+        
+        array = np.ndarray(self.shape, np.uint8, buffer=block.buf)
+        array.flags.writeable = False
+        
+        return array
+    
+    # METHODS # ---------------------------------------------------------------
+    def attach(self) -> BaseImage:
+        """Returns the shared image, mapping the block on the first call of each process."""
+        
+        if self.name not in ATTACHED:
+            block = shared_memory.SharedMemory(name=self.name)
+            array = np.ndarray(self.shape, np.uint8, buffer=block.buf)
+            array.flags.writeable = False
+            
+            image = self.builder(map_array(array), share=True, **self.params)
+            ATTACHED[self.name] = block, image
+        
+        return ATTACHED[self.name][1]
+
+
+def detach(
+        handle: SharedHandle,
+    ) -> None:
+    """Forgets the image of `handle` in this process and unmaps its block.
+    The block stays mapped while any Image still uses it."""
+    
+    block, _ = ATTACHED.pop(handle.name, (None, None))
+    
+    if block is not None:
+        try:
+            block.close()
+        except BufferError:
+            pass
+
+
+def free_blocks(
+        owner: int,
+        blocks: dict[Hashable, shared_memory.SharedMemory],
+        handles: dict[Hashable, SharedHandle],
+    ) -> None:
+    """Frees and forgets every block, if this process is their `owner`."""
+    
+    if os.getpid() != owner:
+        return
+    
+    for key in list(blocks):
+        detach(handles.pop(key))
+        
+        block = blocks.pop(key)
+        block.close()
+        block.unlink()
+
+
+
+class SharedPool:
+    """Owns the shared memory blocks published by this process.
+    Each key is reference counted: `publish` and `acquire` add a reference,
+    `release` removes one and the block is freed when none is left.
+    Every block is freed by `close`, when leaving a `with` block,
+    or once the pool is garbage collected (at the latest at exit).
+    """
+    
+    # DUNDERS # ---------------------------------------------------------------
+    def __init__(self) -> None:
+        self._blocks: dict[Hashable, shared_memory.SharedMemory] = {}
+        self._handles: dict[Hashable, SharedHandle] = {}
+        self._refs: dict[Hashable, int] = {}
+        
+        # Forked workers inherit the pool, but only its owner frees the blocks
+        self._owner: int = os.getpid()
+        
+        # Holds the dicts and not the pool, which can still be collected
+        weakref.finalize(self, free_blocks, self._owner, self._blocks, self._handles)
+    
+    def __str__(self) -> str:
+        return f"SHAREDPOOL | blocks:{len(self)} bytes:{self.nbytes}"
+    
+    def __len__(self) -> int:
+        return len(self._blocks)
+    
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._blocks
+    
+    def __getitem__(self, key: Hashable) -> SharedHandle:
+        return self._handles[key]
+    
+    def __enter__(self) -> "SharedPool":
+        return self
+    
+    def __exit__(self, *exc) -> None:
+        self.close()
+    
+    # PROPERTIES # ------------------------------------------------------------
+    @property
+    def nbytes(self) -> int:
+        return sum(block.size for block in self._blocks.values())
+    
+    # METHODS # ---------------------------------------------------------------
+    def publish(self,
+            key: Hashable,
+            image: BaseImage,
+        ) -> SharedHandle:
+        """Copies `image` into shared memory, once per key, and returns its handle.
+        Publishing a known key only adds a reference."""
+        
+        if key in self._blocks:
+            return self.acquire(key)
+        
+        array = np.ascontiguousarray(image.as_array, np.uint8)
+        
+        # Shaped masks keep their shape, edges and known bounding box
+        params = {
+            name: getattr(image, name)
+            for name in ('shape', 'edges', 'bbox') if hasattr(image, name)
+        }
+        
+        block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        np.ndarray(array.shape, np.uint8, buffer=block.buf)[...] = array
+        
+        self._blocks[key] = block
+        self._handles[key] = SharedHandle(block.name, array.shape, type(image), params)
+        self._refs[key] = 1
+        
+        return self._handles[key]
+    
+    def acquire(self,
+            key: Hashable,
+        ) -> SharedHandle:
+        
+        assert key in self._blocks, f"Unknown shared image: {key}"
+        
+        self._refs[key] += 1
+        
+        return self._handles[key]
+    
+    def release(self,
+            key: Hashable,
+        ) -> None:
+        """Removes a reference, freeing the block when it was the last one."""
+        
+        assert key in self._blocks, f"Unknown shared image: {key}"
+        
+        self._refs[key] -= 1
+        
+        if self._refs[key] <= 0:
+            self._free(key)
+    
+    def close(self) -> None:
+        """Frees every block, whatever its references."""
+        
+        free_blocks(self._owner, self._blocks, self._handles)
+        
+        # Other processes can't free them, so keep counting
+        if not self._blocks:
+            self._refs.clear()
+    
+    def _free(self,
+            key: Hashable,
+        ) -> None:
+        
+        block = self._blocks.pop(key)
+        handle = self._handles.pop(key)
+        self._refs.pop(key)
+        
+        detach(handle)
+        
+        block.close()
+        block.unlink()
@@ -0,0 +1,192 @@
+"""Slices hand-painted tilesheets without copying pixels.
+
+The sheet is decoded once into a single buffer, every tile being a view into it:
+
+```
+sheet = SpriteSheet('terrain.png', (32, 32), margin=1, spacing=2)
+grass = sheet.texture(0, 3)
+walls = sheet.masks()           # a grid of Masks, sharing the buffer
+```
+
+Slicing costs the same for any number of tiles, as nothing is cut until a tile is used.
+Mask sheets ('L') and RGBA tile images wrap the buffer directly,
+Textures (always 'RGB') copy their own tile only.
+"""
+
+from typing import Callable, Literal
+
+import numpy as np
+from PIL import Image
+
+from jabutiles.configs import Shape
+from jabutiles.mask import Mask, ShapeMask
+from jabutiles.tile import Tile
+from jabutiles.layer import Layer
+from jabutiles.texture import Texture
+from jabutiles.maskgen import ShapeMaskGen
+
+
+
+type ShapeMap = Shape | dict[tuple[int, int], Shape] | Callable[[int, int], Shape | None]
+
+
+class SpriteSheet:
+    """A grid of equally sized tiles inside a single image."""
+    
+    # DUNDERS # ---------------------------------------------------------------
+    def __init__(self,
+            image: str | Image.Image,
+            tile_size: tuple[int, int],
+            margin: int | tuple[int, int] = 0,
+            spacing: int | tuple[int, int] = 0,
+            mode: Literal['RGBA', 'L'] = 'RGBA',
+            shapes: ShapeMap = None,
+        ) -> None:
+        """
+        Args:
+            image: the sheet, or its path.
+            tile_size: (width, height) of each tile.
+            margin: pixels around the whole grid, as (x, y) or both.
+            spacing: pixels between neighbouring tiles, as (x, y) or both.
+            mode: 'RGBA' for color sheets, 'L' for sheets of masks.
+            shapes: the Shape of every tile, a {(row, col): Shape} or a function of (row, col).
+        """
+        
+        assert mode in ('RGBA', 'L'), f"Unsupported sheet mode: {mode}"
+        
+        if isinstance(image, str):
+            image = Image.open(image)
+        
+        image = image.convert(mode)
+        
+        margin = margin if isinstance(margin, tuple) else (margin, margin)
+        spacing = spacing if isinstance(spacing, tuple) else (spacing, spacing)
+        
+        W, H = image.size
+        w, h = tile_size
+        C = len(mode)
+        
+        self.mode: str = mode
+        self.tile_size: tuple[int, int] = tile_size
+        self.margin: tuple[int, int] = margin
+        self.spacing: tuple[int, int] = spacing
+        self.shapes: ShapeMap = shapes
+        self.cols: int = (W - 2 * margin[0] + spacing[0]) // (w + spacing[0])
+        self.rows: int = (H - 2 * margin[1] + spacing[1]) // (h + spacing[1])
+        
+        assert self.cols > 0 and self.rows > 0, f"No {tile_size} tile fits in a {image.size} sheet"
+        
+        # Decoded once, with a spare row so the last tiles can be mapped with the full stride
+        self._buffer: np.typing.NDArray = np.zeros((H + 1) * W * C, np.uint8)
+        self.array: np.typing.NDArray = self._buffer[:H * W * C].reshape(H, W, C)
+        self.array[:] = np.asarray(image).reshape(H, W, C)
+        self.array.flags.writeable = False
+        
+        self._stride: int = W * C
+    
+    def __str__(self) -> str:
+        return f"SPRITESHEET | grid:{self.rows}x{self.cols} tile:{self.tile_size} mode:{self.mode}"
+    
+    def __len__(self) -> int:
+        return self.rows * self.cols
+    
+    # PROPERTIES # ------------------------------------------------------------
+    @property
+    def arrays(self) -> np.typing.NDArray:
+        """Every tile as a read-only (rows, cols, h, w, channels) view into the sheet."""
+        
+        w, h = self.tile_size
+        C = len(self.mode)
+        sy, sx, sc = self.array.strides
+        
+        return np.lib.stride_tricks.as_strided(
+            self.array[self.margin[1]:, self.margin[0]:],
+            (self.rows, self.cols, h, w, C),
+            ((h + self.spacing[1]) * sy, (w + self.spacing[0]) * sx, sy, sx, sc),
+            writeable=False,
+        )
+    
+    # METHODS # ---------------------------------------------------------------
+    def box(self,
+            row: int,
+            col: int,
+        ) -> tuple[int, int, int, int]:
+        """The (x0, y0, x1, y1) of a tile inside the sheet."""
+        
+        assert 0 <= row < self.rows and 0 <= col < self.cols, f"No tile at ({row}, {col})"
+        
+        w, h = self.tile_size
+        x = self.margin[0] + col * (w + self.spacing[0])
+        y = self.margin[1] + row * (h + self.spacing[1])
+        
+        return x, y, x + w, y + h
+    
+    def shape(self,
+            row: int,
+            col: int,
+        ) -> Shape | None:
+        
+        if self.shapes is None or isinstance(self.shapes, str):
+            return self.shapes
+        
+        if isinstance(self.shapes, dict):
+            return self.shapes.get((row, col))
+        
+        return self.shapes(row, col)
+    
+    def image(self,
+            row: int,
+            col: int,
+        ) -> Image.Image:
+        """A read-only Image sharing the sheet pixels, copied on its first in-place change."""
+        
+        x0, y0, _, _ = self.box(row, col)
+        offset = y0 * self._stride + x0 * len(self.mode)
+        
+        return Image.frombuffer(self.mode, self.tile_size, self._buffer[offset:],
+            'raw', self.mode, self._stride, 1)
+    
+    def texture(self,
+            row: int,
+            col: int,
+        ) -> Texture:
+        
+        return Texture(self.image(row, col), share=True)
+    
+    def mask(self,
+            row: int,
+            col: int,
+        ) -> Mask:
+        """The tile as a Mask (its alpha on color sheets),
+        or a ShapeMask if a shape is assigned to it."""
+        
+        image = self.image(row, col)
+        if self.mode == 'RGBA':
+            image = image.getchannel('A')
+        
+        shape = self.shape(row, col)
+        
+        return Mask(image, share=True) if shape is None else ShapeMask(image, shape, share=True)
+    
+    def tile(self,
+            row: int,
+            col: int,
+        ) -> Tile:
+        """The tile as a Texture, cut by the generated mask of its shape if it has one."""
+        
+        layers = [Layer(self.texture(row, col))]
+        
+        shape = self.shape(row, col)
+        if shape is not None:
+            layers.append(Layer(None, ShapeMaskGen.from_shape(shape, self.tile_size)))
+        
+        return Tile(layers)
+    
+    def textures(self) -> list[list[Texture]]:
+        return [[self.texture(row, col) for col in range(self.cols)] for row in range(self.rows)]
+    
+    def masks(self) -> list[list[Mask]]:
+        return [[self.mask(row, col) for col in range(self.cols)] for row in range(self.rows)]
+    
+    def tiles(self) -> list[list[Tile]]:
+        return [[self.tile(row, col) for col in range(self.cols)] for row in range(self.rows)]
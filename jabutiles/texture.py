@@ -1,22 +1,31 @@
-from typing import Self, Literal, TYPE_CHECKING
+from typing import Self, Literal, Callable, Iterable, Iterator, TYPE_CHECKING
 if TYPE_CHECKING:
     # Future Imports
     from jabutiles.tile import Tile
     from jabutiles.mask import Mask
     from jabutiles.layer import Layer
     from jabutiles.texture import Texture
+    from jabutiles.compact import IndexedTexture
+
+from functools import partial
 
 import numpy as np
-from PIL import Image, ImageEnhance
+from PIL import Image, ImageEnhance, ImageFilter
 
 from jabutiles.base import BaseImage
-from jabutiles.utils_img import cut_image
+from jabutiles.cache import TieredCache
+from jabutiles.utils_img import (
+    cut_image, adjust_lut, adjust_matrix, adjust_saturates, adjust_drifts, adjust_array,
+    filter_array,
+)
 
 
 
 class Texture(BaseImage["Texture"]):
     """A Texture is a simple image."""
     
+    __slots__ = ()
+    
     # DUNDERS # ---------------------------------------------------------------
     def __init__(self,
             image: str | Image.Image | np.typing.NDArray,
@@ -25,10 +34,12 @@ class Texture(BaseImage["Texture"]):
         # print("Texture.__init__")
         
         params["builder"] = Texture
+        params.setdefault("mode", 'RGB')
         super().__init__(image, **params)
         
         # Ensures all textures are color channel
-        self._image: Image.Image = self._image.convert('RGB')
+        if self._image.mode != 'RGB':
+            self._image: Image.Image = self._image.convert('RGB')
     
     def __str__(self) -> str:
         return f"TEXTURE | size:{self.size} mode:{self.mode}"
@@ -59,7 +70,62 @@ class Texture(BaseImage["Texture"]):
         
         return self.copy_with_params(image)
     
+    def adjust(self, **factors: float) -> Self:
+        """Applies `brightness`, `color` and `contrast` factors in a single pass.
+        The factors are applied in the keyword order, the same as chaining:
+        
+        >>> texture.adjust(contrast=0.666, color=0.75, brightness=1.1)
+        >>> texture.contrast(0.666).color(0.75).brightness(1.1)
+        
+        Results match the chained calls within +-1 per channel, or the steps are chained.
+        Also see `utils_img.adjust_array` for batches.
+        """
+        
+        steps = [(name, factor) for name, factor in factors.items() if factor != 1.0]
+        if not steps:
+            return self
+        
+        # A leading contrast blends with the mean of the greyscale image, as PIL computes it
+        luma = None
+        if steps[0][0] == 'contrast':
+            luma = np.asarray(self._image.convert('L').histogram()) @ np.arange(256) / (self.width * self.height)
+        
+        # Per-channel operations fold into a LUT, applied by PIL directly
+        histogram = self._image.histogram()
+        lut = adjust_lut(steps, histogram, luma)
+        if lut is not None:
+            return self.copy_with_params(self._image.point(lut))
+        
+        # Intermediate clipping and rounding can't be folded, so chains them instead
+        means = np.reshape(histogram, (3, 256)) @ np.arange(256) / (self.width * self.height)
+        lower, upper = zip(*self._image.getextrema())
+        
+        if adjust_drifts(steps, means, luma) or adjust_saturates(steps, means, lower, upper):
+            texture = self
+            for name, factor in steps:
+                texture = getattr(texture, name)(factor)
+            
+            return texture
+        
+        # Otherwise it's a 3x3 color matrix plus offset
+        matrix, offset = adjust_matrix(steps, means, luma)
+        
+        # PIL rounds the matrix results, so the offset compensates to truncate
+        offset = offset - 0.5
+        image = self._image.convert('RGB', tuple(np.hstack((matrix, offset[:, None])).flat))
+        
+        return self.copy_with_params(image)
+    
     # OUTPUT OPERATIONS -------------------------------------------------------
+    def indexed(self,
+            colors: int = 256,
+        ) -> "IndexedTexture":
+        """Returns a compact copy, with palette indices instead of RGB."""
+        
+        from jabutiles.compact import IndexedTexture
+        
+        return IndexedTexture.from_texture(self, colors)
+    
     def combine(self,
             other: "Texture",
             mask: "Mask" = None,
@@ -70,9 +136,16 @@ class Texture(BaseImage["Texture"]):
         
         if mask is None:
             image = Image.blend(self.image, other.image, alpha)
+            
+            return self.copy_with_params(image)
         
-        else:
-            image = Image.composite(other.image, self.image, mask.image)
+        # Only the region under the mask changes
+        if mask.is_empty:
+            return self
+        
+        box = mask.bbox
+        image = self.image.copy()
+        image.paste(other.image.crop(box), box[:2], mask.image.crop(box))
         
         return self.copy_with_params(image)
     
@@ -115,159 +188,413 @@ class Texture(BaseImage["Texture"]):
 
 
 
+class TextureStack:
+    """A batch of same sized Textures, stored as a single (N, H, W, 3) array.  
+    Supports the operations used by the named texture recipes,
+    applying them over the whole batch at once.
+    """
+    
+    # DUNDERS # ---------------------------------------------------------------
+    def __init__(self,
+            array: np.typing.NDArray,
+        ) -> None:
+        
+        assert array.ndim == 4 and array.shape[-1] == 3, \
+            f"Expected a (N, H, W, 3) array, got {array.shape}"
+        
+        self._array: np.typing.NDArray = array
+    
+    def __str__(self) -> str:
+        return f"TEXTURESTACK | count:{len(self)} size:{self.size}"
+    
+    def __len__(self) -> int:
+        return self._array.shape[0]
+    
+    def __getitem__(self, idx: int) -> Texture:
+        return Texture(self._array[idx])
+    
+    def __iter__(self) -> Iterator[Texture]:
+        for idx in range(len(self)):
+            yield self[idx]
+    
+    # PROPERTIES # ------------------------------------------------------------
+    @property
+    def size(self) -> tuple[int, int]:
+        return self._array.shape[2], self._array.shape[1]
+    
+    @property
+    def array(self) -> np.typing.NDArray:
+        """The underlying (N, H, W, 3) array, not a copy."""
+        
+        return self._array
+    
+    @property
+    def views(self) -> list[np.typing.NDArray]:
+        """Each (H, W, 3) array of the stack, as zero-copy views."""
+        
+        return list(self._array)
+    
+    # METHODS # ---------------------------------------------------------------
+    # BASIC INTERFACES
+    @staticmethod
+    def from_textures(textures: Iterable[Texture]) -> "TextureStack":
+        return TextureStack(np.stack([texture.as_array for texture in textures]))
+    
+    def copy_with_params(self,
+            array: np.typing.NDArray,
+        ) -> Self:
+        
+        return TextureStack(array)
+    
+    # IMAGE OPERATIONS
+    def scale(self,
+            factor: float | tuple[float, float],
+            resample: Image.Resampling = Image.Resampling.NEAREST,
+        ) -> Self:
+        """Same as `BaseImage.scale`, but for every Texture."""
+        
+        W, H = self.size
+        
+        if isinstance(factor, (int, float)):
+            newsize = round(W * factor), round(H * factor)
+        else:
+            newsize = int(W * factor[0]), int(H * factor[1])
+        
+        if resample != Image.Resampling.NEAREST:
+            return TextureStack.from_textures(
+                Texture(texture.image.resize(newsize, resample)) for texture in self)
+        
+        # Nearest neighbour is a simple gather, sampling the pixel centers
+        xidx = ((np.arange(newsize[0]) + 0.5) * W / newsize[0]).astype(int)
+        yidx = ((np.arange(newsize[1]) + 0.5) * H / newsize[1]).astype(int)
+        
+        return self.copy_with_params(self._array[:, yidx][:, :, xidx])
+    
+    def smooth(self,
+            level: int = 1,
+            wrap: bool = True,
+            pad: int = 4,
+        ) -> Self:
+        """Same as `BaseImage.smooth`, but for every Texture.  
+        The `pad` is not needed, as the borders are handled exactly.  
+        Level 2 may differ from PIL by 1 where the sum falls exactly halfway,
+        which PIL's float kernel rounds either way. Other levels match exactly."""
+        
+        FILTERS = {
+            -1: ImageFilter.SHARPEN,
+            1 : ImageFilter.SMOOTH,
+            2 : ImageFilter.SMOOTH_MORE,
+            3 : ImageFilter.BLUR,
+        }
+        
+        if level not in FILTERS:
+            return self
+        
+        return self.copy_with_params(filter_array(self._array, FILTERS[level], wrap))
+    
+    # BASIC OPERATIONS
+    def brightness(self, factor: float = 1.0) -> Self:
+        return self.adjust(brightness=factor)
+    
+    def color(self, factor: float = 1.0) -> Self:
+        return self.adjust(color=factor)
+    
+    def contrast(self, factor: float = 1.0) -> Self:
+        return self.adjust(contrast=factor)
+    
+    def adjust(self, **factors: float) -> Self:
+        """Same as `Texture.adjust`, but for every Texture."""
+        
+        steps = [(name, factor) for name, factor in factors.items() if factor != 1.0]
+        if not steps:
+            return self
+        
+        return self.copy_with_params(adjust_array(self._array, steps))
+
+
+
+type TextureRecipe = Callable[..., Texture]
+"""A named texture recipe: `recipe(size, noise, **params) -> Texture`.  
+`noise(size, ranges, mode)` is `TextureGen.random_rgb` bound to the seed.  
+For `named_variants` it returns a `TextureStack` instead, with the same methods."""
+
+
+
 class TextureGen:
+    # Named recipes, as {name: (recipe, version)}
+    RECIPES: dict[str, tuple[TextureRecipe, int]] = {}
+    
+    # Seeded named textures, keyed on (name, size, seed, version, params)
+    CACHE: TieredCache = TieredCache(maxsize=64, builder=Texture)
+    
+    # REGISTRY # --------------------------------------------------------------
+    @staticmethod
+    def register(
+            *names: str,
+            version: int = 1,
+        ) -> Callable[[TextureRecipe], TextureRecipe]:
+        """Decorator that registers a recipe for `named_texture` under `names`.  
+        Bump the `version` when changing a recipe, so cached textures expire.
+        
+        ```
+        @TextureGen.register('lava', version=2)
+        def lava(size, noise):
+            return noise(size, ((200, 255), (32, 96), (0, 16))).smooth(2)
+        ```
+        """
+        
+        def decorator(recipe: TextureRecipe) -> TextureRecipe:
+            for name in names:
+                TextureGen.RECIPES[name.lower()] = (recipe, version)
+            
+            return recipe
+        
+        return decorator
+    
     # TEXTURE GENERATORS # ----------------------------------------------------
     @staticmethod
     def random_rgb(
             size: int | tuple[int, int],
             ranges: list[tuple[int, int]],
             mode: Literal['minmax', 'avgdev'] = 'minmax',
+            rng: np.random.Generator = None,
         ) -> Texture:
-        """ Generates a random RGB Texture from the channels ranges. """
+        """ Generates a random RGB Texture from the channels ranges.  
+        Uses the global numpy random state unless a `rng` is given.  
+        Draws one channel after the other, so seeded results stay the same as ever. """
         
         if isinstance(size, int):
             size = size, size
-        else:
-            size = size[1], size[0] # Yep, numpy is inverted
+        
+        W, H = size
+        low, high = TextureGen._channel_bounds(ranges, mode)
+        
+        randint = np.random.randint if rng is None else rng.integers
+        
+        return Texture(np.stack([randint(low[c], high[c], (H, W), np.uint8) for c in range(3)], axis=-1))
+    
+    @staticmethod
+    def random_rgb_batch(
+            count: int,
+            size: int | tuple[int, int],
+            ranges: list[tuple[int, int]],
+            mode: Literal['minmax', 'avgdev'] = 'minmax',
+            rng: np.random.Generator = None,
+        ) -> TextureStack:
+        """ Generates `count` random RGB Textures from the channels ranges.  
+        All of them are drawn at once, as a single (N, H, W, 3) block. """
+        
+        if isinstance(size, int):
+            size = size, size
+        
+        W, H = size
+        low, high = TextureGen._channel_bounds(ranges, mode)
+        
+        randint = np.random.randint if rng is None else rng.integers
+        
+        return TextureStack(randint(low, high, (count, H, W, 3), np.uint8))
+    
+    @staticmethod
+    def _channel_bounds(
+            ranges: list[tuple[int, int]],
+            mode: Literal['minmax', 'avgdev'],
+        ) -> tuple[np.typing.NDArray, np.typing.NDArray]:
+        """The (low, high) bounds of each channel, high exclusive."""
+        
+        ranges = np.asarray(ranges)
         
         match mode:
             case 'minmax':
-                R = ranges[0][0], ranges[0][1]
-                G = ranges[1][0], ranges[1][1]
-                B = ranges[2][0], ranges[2][1]
+                return ranges[:, 0], ranges[:, 1]
             
             case 'avgdev':
-                R = ranges[0][0] - ranges[0][1], ranges[0][0] + ranges[0][1]
-                G = ranges[1][0] - ranges[1][1], ranges[1][0] + ranges[1][1]
-                B = ranges[2][0] - ranges[2][1], ranges[2][0] + ranges[2][1]
-        
-        image = Image.fromarray(
-            np.stack((
-                np.random.randint(*R, size, np.uint8),
-                np.random.randint(*G, size, np.uint8),
-                np.random.randint(*B, size, np.uint8),
-            ), axis=-1), 'RGB')
-        
-        return Texture(image)
+                return ranges[:, 0] - ranges[:, 1], ranges[:, 0] + ranges[:, 1]
     
     @staticmethod
     def named_texture(
             size: int | tuple[int, int],
             name: str,
+            seed: int = None,
             **params,
         ) -> Texture:
+        """Generates a Texture from a registered recipe (see `register`).  
+        If a `seed` is given, the result is reproducible and cached in `CACHE`.  
+        Cached Textures are shared, so treat them as read-only.
+        """
         
         if isinstance(size, int):
             size = (size, size)
         
-        FULL_SIZE = size
-        HALF_SIZE = size[0]//2, size[1]//2
-        HALF_WIDTH = size[0]//2, size[1]
-        QUARTER_HEIGHT = size[0], size[1]//4
-        
-        texture: Texture = None
-        
-        match name.lower():
-            case 'grass':
-                texture = (TextureGen
-                    .random_rgb(FULL_SIZE,
-                        ((48, 64), (64, 108), (24, 32)))
-                    .smooth(2)
-                    .color(0.9)
-                )
-            case 'grass.dry' | 'path':
-                texture = (TextureGen
-                    .random_rgb(FULL_SIZE,
-                        ((80, 8), (80, 8), (24, 4)), 'avgdev')
-                    .smooth(2)
-                    .color(0.66)
-                )
-            case 'grass.wet' | 'moss':
-                texture = (TextureGen
-                    .random_rgb(FULL_SIZE,
-                        ((48, 4), (64, 4), (24, 4)), 'avgdev')
-                )
-            
-            case 'water':
-                texture = (TextureGen
-                    .random_rgb(HALF_WIDTH,
-                        ((24, 32), (32, 48), (80, 120)))
-                    .scale((2, 1))
-                    .smooth(1)
-                    .smooth(1)
-                )
-            case 'water.shallow' | 'puddle':
-                texture = (TextureGen
-                    .random_rgb(FULL_SIZE,
-                        ((64, 8), (72, 8), (120, 12)), 'avgdev')
-                    .smooth(1)
-                    .smooth(1)
-                )
-            
-            case 'dirt':
-                texture = (TextureGen
-                    .random_rgb(FULL_SIZE,
-                        ((140, 160), (100, 120), (64, 80)))
-                    .smooth(2)
-                )
-            case 'dirt.wet' | 'mud':
-                texture = (TextureGen
-                    .random_rgb(FULL_SIZE,
-                        ((100, 6), (72, 6), (56, 4)), 'avgdev')
-                    .smooth(1)
-                )
-            
-            case 'sand':
-                texture = (TextureGen
-                    .random_rgb(FULL_SIZE,
-                        ((240, 255), (200, 220), (180, 192)))
-                    .smooth(1)
-                )
-            case 'clay':
-                texture = (TextureGen
-                    .random_rgb(FULL_SIZE,
-                        ((108, 120), (64, 80), (48, 64)))
-                    .smooth(2)
-                )
-            
-            case 'stone':
-                texture = (TextureGen
-                    .random_rgb(HALF_SIZE,
-                        ((100, 112), (100, 112), (100, 112)))
-                    .scale(2, Image.Resampling.NEAREST)
-                    .color(0.2)
-                )
-            case 'stone.raw' | 'gravel':
-                texture = (TextureGen
-                    .random_rgb(FULL_SIZE,
-                        ((96, 48), (96, 48), (96, 12)), 'avgdev')
-                    .smooth(2)
-                    .color(0.05)
-                )
-            case 'stone.smooth' | 'marble':
-                texture = (TextureGen
-                    .random_rgb(FULL_SIZE,
-                        ((180, 4), (180, 8), (192, 16)), "avgdev")
-                    .smooth(1)
-                    .color(0.1)
-                )
-            
-            case 'wood':
-                texture = (TextureGen
-                    .random_rgb(QUARTER_HEIGHT,
-                        ((80, 8), (32, 6), (16, 4)), 'avgdev')
-                    .scale((1, 4))
-                    .smooth(3)
-                    .contrast(0.666)
-                    .color(0.75)        # 0.666
-                    .brightness(1.1)    # 1.333  
-                )
-            
-            # case '':
-            #     return
+        name = name.lower()
+        if name not in TextureGen.RECIPES:
+            return Texture(None)
+        
+        recipe, version = TextureGen.RECIPES[name]
+        
+        key = None
+        if seed is not None:
+            key = (name, size, seed, version, tuple(sorted(params.items())))
             
-            case _:
-                texture = Texture()
+            texture = TextureGen.CACHE.get(key)
+            if texture is not None:
+                return texture
+        
+        rng = np.random.default_rng(seed) if seed is not None else None
+        noise = partial(TextureGen.random_rgb, rng=rng)
+        
+        texture: Texture = recipe(size, noise, **params)
+        
+        if key is not None:
+            TextureGen.CACHE.put(key, texture)
         
         return texture
     
+    @staticmethod
+    def named_variants(
+            size: int | tuple[int, int],
+            name: str,
+            count: int,
+            seed: int = None,
+            **params,
+        ) -> TextureStack:
+        """Generates `count` variants of a named Texture at once.  
+        The recipe runs a single time, over the whole batch."""
+        
+        if isinstance(size, int):
+            size = (size, size)
+        
+        name = name.lower()
+        if name not in TextureGen.RECIPES:
+            return TextureStack.from_textures([Texture(None)] * count)
+        
+        recipe, _ = TextureGen.RECIPES[name]
+        
+        rng = np.random.default_rng(seed) if seed is not None else None
+        noise = partial(TextureGen.random_rgb_batch, count, rng=rng)
+        
+        return recipe(size, noise, **params)
+
+
+
+# NAMED TEXTURES # -------------------------------------------------------------
+@TextureGen.register('grass')
+def grass(size: tuple[int, int], noise: Callable[..., Texture]) -> Texture:
+    return (noise(size,
+            ((48, 64), (64, 108), (24, 32)))
+        .smooth(2)
+        .color(0.9)
+    )
+
+
+@TextureGen.register('grass.dry', 'path')
+def grass_dry(size: tuple[int, int], noise: Callable[..., Texture]) -> Texture:
+    return (noise(size,
+            ((80, 8), (80, 8), (24, 4)), 'avgdev')
+        .smooth(2)
+        .color(0.66)
+    )
+
+
+@TextureGen.register('grass.wet', 'moss')
+def grass_wet(size: tuple[int, int], noise: Callable[..., Texture]) -> Texture:
+    return (noise(size,
+            ((48, 4), (64, 4), (24, 4)), 'avgdev')
+    )
+
+
+@TextureGen.register('water')
+def water(size: tuple[int, int], noise: Callable[..., Texture]) -> Texture:
+    HALF_WIDTH = size[0]//2, size[1]
+    
+    return (noise(HALF_WIDTH,
+            ((24, 32), (32, 48), (80, 120)))
+        .scale((2, 1))
+        .smooth(1)
+        .smooth(1)
+    )
+
+
+@TextureGen.register('water.shallow', 'puddle')
+def water_shallow(size: tuple[int, int], noise: Callable[..., Texture]) -> Texture:
+    return (noise(size,
+            ((64, 8), (72, 8), (120, 12)), 'avgdev')
+        .smooth(1)
+        .smooth(1)
+    )
+
+
+@TextureGen.register('dirt')
+def dirt(size: tuple[int, int], noise: Callable[..., Texture]) -> Texture:
+    return (noise(size,
+            ((140, 160), (100, 120), (64, 80)))
+        .smooth(2)
+    )
+
+
+@TextureGen.register('dirt.wet', 'mud')
+def dirt_wet(size: tuple[int, int], noise: Callable[..., Texture]) -> Texture:
+    return (noise(size,
+            ((100, 6), (72, 6), (56, 4)), 'avgdev')
+        .smooth(1)
+    )
+
+
+@TextureGen.register('sand')
+def sand(size: tuple[int, int], noise: Callable[..., Texture]) -> Texture:
+    return (noise(size,
+            ((240, 255), (200, 220), (180, 192)))
+        .smooth(1)
+    )
+
+
+@TextureGen.register('clay')
+def clay(size: tuple[int, int], noise: Callable[..., Texture]) -> Texture:
+    return (noise(size,
+            ((108, 120), (64, 80), (48, 64)))
+        .smooth(2)
+    )
+
+
+@TextureGen.register('stone')
+def stone(size: tuple[int, int], noise: Callable[..., Texture]) -> Texture:
+    HALF_SIZE = size[0]//2, size[1]//2
+    
+    return (noise(HALF_SIZE,
+            ((100, 112), (100, 112), (100, 112)))
+        .scale(2, Image.Resampling.NEAREST)
+        .color(0.2)
+    )
+
+
+@TextureGen.register('stone.raw', 'gravel')
+def stone_raw(size: tuple[int, int], noise: Callable[..., Texture]) -> Texture:
+    return (noise(size,
+            ((96, 48), (96, 48), (96, 12)), 'avgdev')
+        .smooth(2)
+        .color(0.05)
+    )
+
+
+@TextureGen.register('stone.smooth', 'marble')
+def stone_smooth(size: tuple[int, int], noise: Callable[..., Texture]) -> Texture:
+    return (noise(size,
+            ((180, 4), (180, 8), (192, 16)), "avgdev")
+        .smooth(1)
+        .color(0.1)
+    )
+
+
+@TextureGen.register('wood')
+def wood(size: tuple[int, int], noise: Callable[..., Texture]) -> Texture:
+    QUARTER_HEIGHT = size[0], size[1]//4
+    
+    return (noise(QUARTER_HEIGHT,
+            ((80, 8), (32, 6), (16, 4)), 'avgdev')
+        .scale((1, 4))
+        .smooth(3)
+        .adjust(
+            contrast=0.666,
+            color=0.75,         # 0.666
+            brightness=1.1,     # 1.333
+        )
+    )
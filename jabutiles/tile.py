@@ -1,19 +1,28 @@
+import threading
+import random as rnd
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from jabutiles.shade import Shade
 
 from PIL import Image, ImageOps
 
-from jabutiles.mask import Mask, ShapeMask
+from jabutiles.mask import Mask, ShapeMask, EdgeMask
 from jabutiles.layer import Layer
 from jabutiles.texture import Texture
-from jabutiles.utils_img import cut_image, display_image
+from jabutiles.utils import combine_choices
+from jabutiles.utils_img import cut_image, display_image, image_digest
 
 
 
 class Tile:
     """"""
     
+    # Private names are mangled here too, as '_Tile__cache', ...
+    __slots__ = ('_layers', '__cache', '__digest', '__generation', '__weakref__')
+    
+    # Guards the cache swaps of every Tile, only held for an instant
+    _LOCK = threading.Lock()
+    
     # DUNDERS # ---------------------------------------------------------------
     def __init__(self,
             layers: list["Layer"],
@@ -22,6 +31,8 @@ class Tile:
         
         self._layers: list["Layer"] = list(layers)
         self.__cache: Image.Image = None
+        self.__digest: str = None
+        self.__generation: int = 0  # Bumped on every change of layers
     
     def __len__(self) -> int:
         return len(self._layers)
@@ -37,39 +48,94 @@ class Tile:
     def size(self) -> tuple[int, int]:
         return self._layers[0].size
     
+    @property
+    def edges(self) -> str | None:
+        """The edges of all EdgeMask layers combined, None if there are none."""
+        
+        edges = None
+        
+        for layer in self._layers:
+            if isinstance(layer.mask, EdgeMask):
+                edges = layer.mask.edges if edges is None else combine_choices(edges, layer.mask.edges)
+        
+        return edges
+    
+    @property
+    def digest(self) -> str:
+        """The content hash of the rendered image (see `image_digest`)."""
+        
+        digest = self.__digest
+        if digest is not None:
+            return digest
+        
+        generation = self.__generation
+        digest = image_digest(self.image)
+        
+        with Tile._LOCK:
+            if generation == self.__generation:
+                self.__digest = digest
+        
+        return digest
+    
     @property
     def image(self) -> Image.Image:
-        if self.__cache is not None:
-            print(f"Using cached image")
-            return self.__cache
+        """The rendered layers, cached until they change.  
+        Safe to read from many threads, which at worst render it more than once."""
+        
+        cache = self.__cache
+        if cache is not None:
+            return cache
+        
+        generation = self.__generation
+        layers = list(self._layers)
         
-        if len(self._layers) == 1:
-            return self._layers[0].image
+        if len(layers) == 1:
+            return layers[0].image
         
-        last_is_shape: bool = self._layers[-1].subtype == "mask"
-        last_layer: int = len(self)
+        image = Tile.composite(layers)
+        
+        # Layers changed while rendering, the image is already outdated
+        with Tile._LOCK:
+            if generation == self.__generation:
+                self.__cache = image
+        
+        return image
+    
+    # METHODS # ---------------------------------------------------------------
+    @staticmethod
+    def composite(
+            layers: list["Layer"],
+            image: Image.Image = None,
+            rng: rnd.Random = None,
+        ) -> Image.Image:
+        """Pastes the `layers` in order over a copy of `image` (black by default),
+        cutting the result by the last layer if it is a shape.  
+        The `rng` is passed to the shades (see `Shade.apply`)."""
+        
+        last_is_shape: bool = layers[-1].subtype == "mask"
+        last_layer: int = len(layers)
         if last_is_shape:
             last_layer -= 1
         
-        image = Image.new("RGB", self.size, (0, 0, 0))
+        if image is None:
+            image = Image.new("RGB", layers[0].size, (0, 0, 0))
+        else:
+            image = image.copy()
         
         for idx in range(0, last_layer):
-            layer: "Layer" = self._layers[idx]
+            layer: "Layer" = layers[idx]
             
             shade = layer.on_other
             if shade is not None:
-                image = shade.stamp(Texture(image), layer.mask).image
+                image = shade.stamp(Texture(image), layer.mask, rng).image
             
-            image.paste(layer.image, mask=layer.mask.image)
+            layer.paste_on(image, rng)
         
         if last_is_shape:
-            image = cut_image(image, self._layers[-1].mask.image)
-        
-        self.__cache = image
+            image = cut_image(image, layers[-1].mask.image)
         
         return image
     
-    # METHODS # ---------------------------------------------------------------
     # BASIC INTERFACES
     def display(self,
             factor: float = 1.0,
@@ -92,7 +158,10 @@ class Tile:
         self._layers.insert(0, Layer(base))
         
         # Resets cache
-        self.__cache = None
+        with Tile._LOCK:
+            self.__cache = None
+            self.__digest = None
+            self.__generation += 1
     
     def set_shape(self,
             mask: "ShapeMask",
@@ -108,5 +177,8 @@ class Tile:
         self._layers.append(Layer(None, mask))
         
         # Resets cache
-        self.__cache = None
+        with Tile._LOCK:
+            self.__cache = None
+            self.__digest = None
+            self.__generation += 1
     
@@ -0,0 +1,586 @@
+"""Renders large orthogonal maps from a grid of tile ids.
+
+Each unique tile is rendered once into a stacked (K, th, tw, 4) array.
+The map is then assembled block by block, each block a single gather of that stack,
+and written to a memory-mapped `.npy`, a streamed `.png` or an array.
+Peak memory depends on the block size, not on the map size:
+
+```
+table = TileTable({0: grass_tile, 1: water_tile, 2: sand_tile})
+render_map(grid, table, 'world.png', chunk=(16, 256))
+```
+"""
+
+from typing import Any, Callable, Iterator, Mapping
+
+import numpy as np
+from PIL import Image
+
+from jabutiles.base import BaseImage
+from jabutiles.mask import Mask
+from jabutiles.configs import Shape
+from jabutiles.export import PNGStreamWriter
+from jabutiles.maskgen import ShapeMaskGen
+from jabutiles.tile import Tile
+
+
+
+def as_rgba(
+        tile: Any,
+    ) -> np.typing.NDArray:
+    """Renders a Tile, BaseImage, Image or callable (e.g. a Recipe) as an RGBA array."""
+    
+    if callable(tile) and not isinstance(tile, (Tile, BaseImage, Image.Image)):
+        tile = tile()
+    
+    if isinstance(tile, (Tile, BaseImage)):
+        tile = tile.image
+    
+    return np.asarray(tile.convert('RGBA'))
+
+
+
+def alpha_boxes(
+        stack: np.typing.NDArray,
+    ) -> np.typing.NDArray:
+    """The (left, top, right, bottom) box of the visible pixels of each RGBA tile.
+    Fully transparent tiles get an empty (0, 0, 0, 0) box."""
+    
+    visible = stack[..., 3] > 0
+    rows, cols = visible.any(axis=2), visible.any(axis=1)
+    
+    boxes = np.stack((
+        cols.argmax(axis=1),
+        rows.argmax(axis=1),
+        cols.shape[1] - cols[:, ::-1].argmax(axis=1),
+        rows.shape[1] - rows[:, ::-1].argmax(axis=1),
+    ), axis=-1)
+    
+    boxes[~rows.any(axis=1)] = 0
+    
+    return boxes
+
+
+
+class TileTable:
+    """The rendered tiles of a map, by id.
+    Ids missing from the table are drawn transparent.
+    """
+    
+    # DUNDERS # ---------------------------------------------------------------
+    def __init__(self,
+            tiles: Mapping[int, Any],
+        ) -> None:
+        
+        assert len(tiles) > 0, "The table needs at least one tile"
+        
+        self.ids: np.typing.NDArray = np.array(sorted(tiles), np.int64)
+        
+        arrays = [as_rgba(tiles[idx]) for idx in self.ids.tolist()]
+        
+        shapes = {array.shape for array in arrays}
+        assert len(shapes) == 1, f"All tiles must have the same size, got {shapes}"
+        
+        # The last entry is the transparent tile for unknown ids
+        arrays.append(np.zeros_like(arrays[0]))
+        self.stack: np.typing.NDArray = np.stack(arrays)
+        self.boxes: np.typing.NDArray = alpha_boxes(self.stack)
+    
+    def __str__(self) -> str:
+        return f"TILETABLE | tiles:{len(self)} size:{self.tile_size}"
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    # PROPERTIES # ------------------------------------------------------------
+    @property
+    def tile_size(self) -> tuple[int, int]:
+        return self.stack.shape[2], self.stack.shape[1]
+    
+    # METHODS # ---------------------------------------------------------------
+    def cut(self,
+            mask: Mask,
+        ) -> "TileTable":
+        """Returns a table with every tile cut by the `mask` (alpha = min(alpha, mask))."""
+        
+        assert mask.size == self.tile_size, \
+            f"Incompatible mask size: {mask.size} vs {self.tile_size}"
+        
+        table = object.__new__(TileTable)
+        table.ids = self.ids
+        table.stack = self.stack.copy()
+        np.minimum(table.stack[..., 3], mask.as_array, out=table.stack[..., 3])
+        table.boxes = alpha_boxes(table.stack)
+        
+        return table
+    
+    def lookup(self,
+            grid: np.typing.NDArray,
+        ) -> np.typing.NDArray:
+        """Turns tile ids into positions of the stack."""
+        
+        pos = np.searchsorted(self.ids, grid).clip(0, len(self.ids) - 1)
+        
+        return np.where(self.ids[pos] == grid, pos, len(self.ids))
+    
+    def blit(self,
+            grid: np.typing.NDArray,
+        ) -> np.typing.NDArray:
+        """Assembles a (rows, cols) block of ids into its (rows*th, cols*tw, 4) pixels."""
+        
+        rows, cols = grid.shape
+        tw, th = self.tile_size
+        
+        block = self.stack[self.lookup(grid)]   # (rows, cols, th, tw, 4)
+        
+        return block.transpose(0, 2, 1, 3, 4).reshape(rows * th, cols * tw, 4)
+
+
+
+def iter_blocks(
+        grid: np.typing.NDArray,
+        table: TileTable,
+        chunk: tuple[int, int] = (16, 64),
+    ) -> Iterator[tuple[tuple[int, int], np.typing.NDArray]]:
+    """Yields ((y, x), pixels) for each block of `chunk` (rows, cols) cells,
+    row by row, where (y, x) is the pixel position of the block."""
+    
+    R, C = grid.shape
+    cr, cc = chunk
+    tw, th = table.tile_size
+    
+    for r0 in range(0, R, cr):
+        for c0 in range(0, C, cc):
+            yield (r0 * th, c0 * tw), table.blit(grid[r0:r0+cr, c0:c0+cc])
+
+
+def open_output(
+        out: str | np.typing.NDArray | None,
+        shape: tuple[int, int, int],
+    ) -> np.typing.NDArray:
+    """Returns the array to render into: a new one, the given one or a new `.npy` memmap."""
+    
+    if out is None:
+        out = np.zeros(shape, np.uint8)
+    
+    elif isinstance(out, str):
+        out = np.lib.format.open_memmap(out, 'w+', np.uint8, shape)
+    
+    assert out.shape == shape, f"Expected an output of shape {shape}"
+    
+    return out
+
+
+def render_map(
+        grid: np.typing.NDArray,
+        table: TileTable | Mapping[int, Any],
+        out: str | np.typing.NDArray = None,
+        chunk: tuple[int, int] = (16, 64),
+    ) -> np.typing.NDArray | str:
+    """Renders the `grid` of tile ids using the `table`.
+    
+    Args:
+        grid: (rows, cols) integer array of tile ids.
+        table: a TileTable, or a {id: tile} mapping to build one.
+        out: where to write the (H, W, 4) pixels:
+            - None, a new array in memory
+            - an array, e.g. an existing memmap
+            - a `.npy` path, written as a memory-mapped file
+            - a `.png` path, streamed by bands of `chunk[0]` rows
+        chunk: (rows, cols) of cells assembled at once.
+    
+    Returns:
+        The output array, or the path of a `.png`.
+    """
+    
+    if not isinstance(table, TileTable):
+        table = TileTable(table)
+    
+    grid = np.asarray(grid)
+    tw, th = table.tile_size
+    shape = grid.shape[0] * th, grid.shape[1] * tw, 4
+    
+    if isinstance(out, str) and out.endswith('.png'):
+        # Rows must be written whole, so bands span all the columns
+        with PNGStreamWriter(out, (shape[1], shape[0])) as png:
+            for _, band in iter_blocks(grid, table, (chunk[0], grid.shape[1])):
+                png.write_rows(band)
+        
+        return out
+    
+    out = open_output(out, shape)
+    
+    for (y, x), block in iter_blocks(grid, table, chunk):
+        out[y:y+block.shape[0], x:x+block.shape[1]] = block
+    
+    if isinstance(out, np.memmap):
+        out.flush()
+    
+    return out
+
+
+
+# LAYERED MAPS # ---------------------------------------------------------------
+class MapLayout:
+    """Screen positions and draw order of the cells of a map.
+    
+    - `orthogonal`: a plain grid.
+    - `isometric`: rows are half a tile apart, odd rows shift half a tile right.
+    - `hexagonal.flat`: columns are 3/4 of a tile apart, odd columns shift half a tile down.
+    - `hexagonal.point`: rows are 3/4 of a tile apart, odd rows shift half a tile right.
+    
+    Cells are drawn back to front in batches, the tiles of a batch never overlap.
+    """
+    
+    # DUNDERS # ---------------------------------------------------------------
+    def __init__(self,
+            shape: Shape,
+            grid_shape: tuple[int, int],
+            tile_size: tuple[int, int],
+        ) -> None:
+        
+        R, C = grid_shape
+        W, H = tile_size
+        rows, cols = np.indices(grid_shape)
+        
+        match shape:
+            case 'orthogonal':
+                xs = cols * W
+                ys = rows * H
+                batch = rows
+            
+            case 'isometric':
+                xs = cols * W + (rows % 2) * (W // 2)
+                ys = rows * (H // 2)
+                batch = rows
+            
+            case 'hexagonal.flat':
+                xs = cols * (3 * W // 4)
+                ys = rows * H + (cols % 2) * (H // 2)
+                batch = rows * 2 + cols % 2
+            
+            case 'hexagonal.point':
+                xs = cols * W + (rows % 2) * (W // 2)
+                ys = rows * (3 * H // 4)
+                batch = rows
+            
+            case _:
+                raise ValueError(f"Unknown shape: {shape}")
+        
+        self.shape: Shape = shape
+        self.grid_shape: tuple[int, int] = grid_shape
+        self.tile_size: tuple[int, int] = tile_size
+        self.size: tuple[int, int] = int(xs.max()) + W, int(ys.max()) + H
+        
+        # The (x, y) screen position of each cell
+        self.positions: np.typing.NDArray = np.stack((xs, ys), axis=-1)
+        
+        # The cells sorted by batch, and where each batch starts and ends
+        order = np.argsort(batch, axis=None, kind='stable')
+        self.cells: np.typing.NDArray = np.stack(np.unravel_index(order, grid_shape), axis=-1)
+        self.xs: np.typing.NDArray = xs.ravel()[order]
+        self.ys: np.typing.NDArray = ys.ravel()[order]
+        
+        counts = np.bincount(batch.ravel())
+        self.bounds: np.typing.NDArray = np.concatenate(([0], np.cumsum(counts)))
+        
+        # The screen rows covered by each batch
+        self.tops: np.typing.NDArray = np.minimum.reduceat(self.ys, self.bounds[:-1])
+        self.bottoms: np.typing.NDArray = np.maximum.reduceat(self.ys, self.bounds[:-1]) + H
+    
+    def __str__(self) -> str:
+        return f"MAPLAYOUT | {self.shape} grid:{self.grid_shape} size:{self.size}"
+    
+    # METHODS # ---------------------------------------------------------------
+    def batches(self,
+            top: int,
+            bottom: int,
+        ) -> Iterator[slice]:
+        """The batches drawn over the screen rows [top, bottom), in draw order."""
+        
+        for idx in np.nonzero((self.tops < bottom) & (self.bottoms > top))[0]:
+            yield slice(self.bounds[idx], self.bounds[idx+1])
+
+
+def alpha_over(
+        src: np.typing.NDArray,
+        dst: np.typing.NDArray,
+    ) -> np.typing.NDArray:
+    """Composites RGBA pixels `src` over `dst`, like `Image.alpha_composite`."""
+    
+    sa = src[..., 3:].astype(np.float32) / 255
+    da = dst[..., 3:].astype(np.float32) / 255
+    
+    alpha = sa + da * (1 - sa)
+    rgb = src[..., :3] * sa + dst[..., :3] * da * (1 - sa)
+    rgb /= np.where(alpha > 0, alpha, 1)
+    
+    out = np.concatenate((rgb, alpha * 255), axis=-1)
+    
+    return np.clip(out + 0.5, 0, 255).astype(np.uint8)
+
+
+def composite_region(
+        grid: np.typing.NDArray,
+        table: TileTable,
+        layout: "MapLayout",
+        box: tuple[int, int, int, int],
+    ) -> np.typing.NDArray:
+    """Composites the screen `box` (left, top, right, bottom) of a map."""
+    
+    x0, y0, x1, y1 = box
+    W, H = layout.tile_size
+    region = np.zeros((y1 - y0, x1 - x0, 4), np.uint8)
+    
+    dy = np.arange(H)[None, :, None]
+    dx = np.arange(W)[None, None, :]
+    
+    for cells in layout.batches(y0, y1):
+        # Only the cells of the batch crossing the box
+        inside = (layout.xs[cells] < x1) & (layout.xs[cells] + W > x0)
+        if not inside.any():
+            continue
+        
+        rows, cols = layout.cells[cells][inside].T
+        tiles = table.lookup(grid[rows, cols])
+        
+        # Every pixel of the batch, skipping transparent ones and those out of the box
+        ys = layout.ys[cells][inside][:, None, None] + dy - y0
+        xs = layout.xs[cells][inside][:, None, None] + dx - x0
+        visible = (table.stack[tiles][..., 3] > 0) \
+            & (ys >= 0) & (ys < region.shape[0]) & (xs >= 0) & (xs < region.shape[1])
+        
+        n, y, x = np.nonzero(visible)
+        Y, X = ys[n, y, 0], xs[n, 0, x]
+        pixels = table.stack[tiles[n], y, x]
+        
+        # Opaque pixels are copied, only the translucent ones are blended
+        blend = pixels[:, 3] < 255
+        
+        if blend.any():
+            pixels[blend] = alpha_over(pixels[blend], region[Y[blend], X[blend]])
+        
+        region[Y, X] = pixels
+    
+    return region
+
+
+def composite_map(
+        grid: np.typing.NDArray,
+        table: TileTable | Mapping[int, Any],
+        shape: Shape,
+        out: str | np.typing.NDArray = None,
+        band: int = 256,
+        cut: bool = True,
+    ) -> np.typing.NDArray | str:
+    """Composites an isometric or hexagonal map, band by band of screen rows.
+    
+    Args:
+        grid: (rows, cols) integer array of tile ids.
+        table: a TileTable, or a {id: tile} mapping to build one.
+        shape: the layout, one of 'isometric', 'hexagonal.flat' or 'hexagonal.point'.
+        out: where to write the pixels, as in `render_map`.
+        band: screen rows composited at once.
+        cut: cuts the tiles with the matching `ShapeMaskGen` shape first.
+    
+    Returns:
+        The output array, or the path of a `.png`.
+    """
+    
+    if not isinstance(table, TileTable):
+        table = TileTable(table)
+    
+    grid = np.asarray(grid)
+    
+    if cut:
+        table = table.cut(ShapeMaskGen.from_shape(shape, table.tile_size))
+    
+    layout = MapLayout(shape, grid.shape, table.tile_size)
+    W, H = layout.size
+    bands = range(0, H, band)
+    
+    if isinstance(out, str) and out.endswith('.png'):
+        with PNGStreamWriter(out, layout.size) as png:
+            for top in bands:
+                png.write_rows(composite_region(grid, table, layout, (0, top, W, min(top + band, H))))
+        
+        return out
+    
+    out = open_output(out, (H, W, 4))
+    
+    for top in bands:
+        bottom = min(top + band, H)
+        out[top:bottom] = composite_region(grid, table, layout, (0, top, W, bottom))
+    
+    if isinstance(out, np.memmap):
+        out.flush()
+    
+    return out
+
+
+
+# EDITABLE MAPS # --------------------------------------------------------------
+type Box = tuple[int, int, int, int]
+
+
+def merge_boxes(
+        boxes: list[Box],
+    ) -> list[Box]:
+    """Joins the overlapping boxes, until none of them overlap."""
+    
+    merged: list[Box] = []
+    
+    for box in boxes:
+        while True:
+            for idx, other in enumerate(merged):
+                if box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]:
+                    merged.pop(idx)
+                    box = (min(box[0], other[0]), min(box[1], other[1]),
+                           max(box[2], other[2]), max(box[3], other[3]))
+                    break
+            else:
+                break
+        
+        merged.append(box)
+    
+    return merged
+
+
+
+class MapCanvas:
+    """A composited map that re-renders only the regions changed by an edit.
+    
+    Keeps the terrain, the tile chosen for each cell and the screen box it covers.
+    An `autotile(terrain, row, col) -> tile id` callable picks tiles from the neighbours,
+    without it the terrain values are the tile ids themselves.
+    
+    ```
+    canvas = MapCanvas(terrain, table, 'isometric', autotile=pick_edges)
+    for box in canvas.edit({(4, 7): WATER}):
+        editor.update(box, canvas.array[box[1]:box[3], box[0]:box[2]])
+    ```
+    """
+    
+    # DUNDERS # ---------------------------------------------------------------
+    def __init__(self,
+            terrain: np.typing.NDArray,
+            table: TileTable | Mapping[int, Any],
+            shape: Shape = 'orthogonal',
+            autotile: Callable[[np.typing.NDArray, int, int], int] = None,
+            radius: int = 1,
+            band: int = 256,
+            cut: bool = True,
+        ) -> None:
+        """`radius` is how far the autotile looks, so how many neighbours an edit affects.  
+        `band` and `cut` are the same as in `composite_map`."""
+        
+        if not isinstance(table, TileTable):
+            table = TileTable(table)
+        
+        if cut:
+            table = table.cut(ShapeMaskGen.from_shape(shape, table.tile_size))
+        
+        self.terrain: np.typing.NDArray = np.array(terrain)
+        self.table: TileTable = table
+        self.autotile: Callable[[np.typing.NDArray, int, int], int] = autotile
+        self.radius: int = radius
+        
+        self.layout: MapLayout = MapLayout(shape, self.terrain.shape, table.tile_size)
+        
+        rows, cols = np.indices(self.terrain.shape)
+        self.tiles: np.typing.NDArray = self._choose(rows.ravel(), cols.ravel()).reshape(self.terrain.shape)
+        self.boxes: np.typing.NDArray = self._boxes(self.tiles)
+        
+        W, H = self.layout.size
+        self.array: np.typing.NDArray = np.zeros((H, W, 4), np.uint8)
+        
+        for top in range(0, H, band):
+            self._render((0, top, W, min(top + band, H)))
+    
+    def __str__(self) -> str:
+        return f"MAPCANVAS | {self.layout.shape} grid:{self.terrain.shape} size:{self.layout.size}"
+    
+    # PROPERTIES # ------------------------------------------------------------
+    @property
+    def image(self) -> Image.Image:
+        return Image.fromarray(self.array, 'RGBA')
+    
+    # METHODS # ---------------------------------------------------------------
+    def edit(self,
+            changes: Mapping[tuple[int, int], Any],
+        ) -> list[Box]:
+        """Sets the terrain of the `changes` cells, re-renders what changed
+        and returns the dirty boxes (left, top, right, bottom) of the screen."""
+        
+        R, C = self.terrain.shape
+        near: set[tuple[int, int]] = set()
+        
+        for (row, col), value in changes.items():
+            self.terrain[row, col] = value
+            
+            # The autotile of the neighbours may change too
+            for r in range(max(0, row - self.radius), min(R, row + self.radius + 1)):
+                for c in range(max(0, col - self.radius), min(C, col + self.radius + 1)):
+                    near.add((r, c))
+        
+        if not near:
+            return []
+        
+        rows, cols = np.array(sorted(near)).T
+        tiles = self._choose(rows, cols)
+        
+        changed = tiles != self.tiles[rows, cols]
+        rows, cols, tiles = rows[changed], cols[changed], tiles[changed]
+        
+        # Both the old and the new tile regions must be redrawn
+        dirty = [tuple(box) for box in self.boxes[rows, cols].tolist()]
+        
+        self.tiles[rows, cols] = tiles
+        self.boxes[rows, cols] = self._boxes(self.tiles[rows, cols], rows, cols)
+        
+        dirty += [tuple(box) for box in self.boxes[rows, cols].tolist()]
+        dirty = merge_boxes([box for box in dirty if box[0] < box[2] and box[1] < box[3]])
+        
+        for box in dirty:
+            self._render(box)
+        
+        return dirty
+    
+    def _choose(self,
+            rows: np.typing.NDArray,
+            cols: np.typing.NDArray,
+        ) -> np.typing.NDArray:
+        """The tile ids of the cells, picked by the autotile."""
+        
+        if self.autotile is None:
+            return self.terrain[rows, cols].copy()
+        
+        return np.array([
+            self.autotile(self.terrain, row, col)
+            for row, col in zip(rows.tolist(), cols.tolist())
+        ], np.int64)
+    
+    def _boxes(self,
+            tiles: np.typing.NDArray,
+            rows: np.typing.NDArray = None,
+            cols: np.typing.NDArray = None,
+        ) -> np.typing.NDArray:
+        """The screen boxes covered by the `tiles`, placed at their cells (all by default)."""
+        
+        positions = self.layout.positions if rows is None else self.layout.positions[rows, cols]
+        
+        boxes = self.table.boxes[self.table.lookup(tiles)].copy()
+        empty = boxes[..., 2] == 0
+        
+        boxes[..., 0::2] += positions[..., :1]
+        boxes[..., 1::2] += positions[..., 1:]
+        boxes[empty] = 0
+        
+        return boxes
+    
+    def _render(self,
+            box: Box,
+        ) -> None:
+        
+        x0, y0, x1, y1 = box
+        self.array[y0:y1, x0:x1] = composite_region(self.tiles, self.table, self.layout, box)
@@ -1,5 +1,8 @@
+import hashlib
 import random as rnd
+from typing import Literal, Sequence
 
+import numpy as np
 from PIL import (
     Image, ImageOps, ImageDraw, ImageChops, ImageFilter, ImageEnhance
 )
@@ -63,12 +66,67 @@ def cut_image(
     return base
 
 
+def expand_box(
+        box: tuple[int, int, int, int] | None,
+        margin: int,
+        size: tuple[int, int],
+    ) -> tuple[int, int, int, int] | None:
+    """Grows the `box` by `margin` on all sides, limited to the image `size`."""
+    
+    if box is None:
+        return None
+    
+    x0, y0, x1, y1 = box
+    W, H = size
+    
+    return max(0, x0 - margin), max(0, y0 - margin), min(W, x1 + margin), min(H, y1 + margin)
+
+
+def map_array(
+        array: np.typing.NDArray,
+    ) -> Image.Image:
+    """Wraps an uint8 array as an Image without copying, when PIL allows it.
+    Only 'L' (H, W) and 'RGBA' (H, W, 4) share the pixel layout of the array,
+    other shapes are copied by `Image.fromarray`.
+    A read-only array gives a read-only Image, copied on the first in-place change."""
+    
+    if array.ndim == 2:
+        mode = 'L'
+    elif array.ndim == 3 and array.shape[2] == 4:
+        mode = 'RGBA'
+    else:
+        mode = None
+    
+    if mode is None or array.dtype != np.uint8 or not array.flags.c_contiguous:
+        return Image.fromarray(array)
+    
+    size = array.shape[1], array.shape[0]
+    
+    return Image.frombuffer(mode, size, array, 'raw', mode, 0, 1)
+
+
+def image_digest(
+        image: Image.Image,
+    ) -> str:
+    """A sha1 of the mode, size and pixels, equal only for identical images."""
+    
+    digest = hashlib.sha1(f"{image.mode}{image.size}".encode())
+    digest.update(image.tobytes())
+    
+    return digest.hexdigest()
+
+
 def get_outline(
         image: Image.Image,
         thickness: float = 1.0,
         color: str | tuple[int, int, int] = "white",
         dist: float = 1.0,
+        rng: rnd.Random = None,
     ) -> Image.Image:
+    """Draws the edges of the image, each edge pixel kept with probability `dist`.
+    Pass a seeded `rng` for reproducible (and thread independent) results."""
+    
+    random = rnd.random if rng is None else rng.random
     
     ref_image = image.convert("RGBA")
     
@@ -81,15 +139,22 @@ def get_outline(
     
     # Ensures thickness is always at least 1
     T = clamp(thickness, (1, 1000))
-    W, H = ref_image.size
-    edge = ref_image.filter(ImageFilter.FIND_EDGES).load()
     
-    for x in range(W):
-        for y in range(H):
-            if not edge[x,y][3]:
+    # Edges only exist around the non-transparent region, plus 1 pixel
+    # of margin so the filter sees the same neighbourhood
+    box = expand_box(ref_image.getchannel('A').getbbox(), 1, ref_image.size)
+    if box is None:
+        box = (0, 0, 0, 0)
+    
+    X0, Y0, X1, Y1 = box
+    edge = ref_image.getchannel('A').crop(box).filter(ImageFilter.FIND_EDGES).load()
+    
+    for x in range(X0, X1):
+        for y in range(Y0, Y1):
+            if not edge[x-X0,y-Y0]:
                 continue
             
-            if dist < rnd.random():
+            if dist < random():
                 continue
             
             if T % 1 == 0: # 1, 2, 3, ...round corners
@@ -105,4 +170,334 @@ def get_outline(
 
 
 
+# COLOR ADJUSTMENTS # ----------------------------------------------------------
+# Luminance weights used by PIL's RGB -> L conversion (ITU-R 601-2)
+LUMA = np.array([19595, 38470, 7471], np.float64) / 65536
+
+type Adjustment = tuple[Literal['brightness', 'color', 'contrast'], float]
+
+
+def adjust_lut(
+        steps: Sequence[Adjustment],
+        histogram: Sequence[int],
+        luma: float = None,
+    ) -> list[int] | None:
+    """Folds the `steps` into a single per-channel lookup table.  
+    Only possible when no `color` step changes the image, as it mixes channels.  
+    `histogram` is the RGB histogram of the source, and `luma` the mean of its greyscale,
+    required by a leading `contrast`.  
+    Returns None if the steps can't be represented as a LUT.
+    """
+    
+    hist = np.asarray(histogram, np.float64).reshape(3, 256)
+    lut = np.arange(256, dtype=np.float64)
+    
+    for idx, (name, factor) in enumerate(steps):
+        match name:
+            case 'brightness':
+                lut = lut * factor
+            
+            case 'contrast':
+                # Later steps would need the greyscale of every pixel for the mean
+                if idx > 0:
+                    return None
+                
+                means = (hist @ lut) / hist[0].sum()
+                level = np.floor((means @ LUMA if luma is None else luma) + 0.5)
+                lut = level + factor * (lut - level)
+            
+            case 'color':
+                if factor != 1.0:
+                    return None
+            
+            case _:
+                raise ValueError(f"Unknown adjustment: {name}")
+        
+        # Mimics PIL's blend, which clips and truncates on every step
+        lut = np.floor(np.clip(lut, 0, 255))
+    
+    return lut.astype(np.uint8).tolist() * 3
+
+
+def adjust_matrix(
+        steps: Sequence[Adjustment],
+        means: np.typing.NDArray,
+        luma: np.typing.NDArray = None,
+    ) -> tuple[np.typing.NDArray, np.typing.NDArray]:
+    """Folds the `steps` into a single 3x3 color matrix plus an offset.  
+    `means` are the average RGB values of the source, shaped (..., 3),
+    and `luma` the average of its greyscale (...), used by a leading `contrast`.  
+    Returns the matrix (3, 3) and the offsets (..., 3), so `rgb @ M.T + c`.
+    
+    The offsets already discount the truncation PIL does in between steps.
+    """
+    
+    means = np.asarray(means, np.float64)
+    
+    matrix = np.eye(3)
+    offset = np.zeros_like(means)
+    
+    for idx, (name, factor) in enumerate(steps):
+        step, shift = _adjust_step(name, factor, means @ matrix.T + offset, luma if idx == 0 else None)
+        
+        matrix = step @ matrix
+        offset = offset @ step.T + shift
+        
+        # Every intermediate blend truncates, losing half a unit on average
+        if idx < len(steps) - 1:
+            offset -= 0.5
+    
+    return matrix, offset
+
+
+def adjust_array(
+        array: np.typing.NDArray,
+        steps: Sequence[Adjustment],
+        weights: np.typing.NDArray = None,
+    ) -> np.typing.NDArray:
+    """Applies the `steps` over RGB arrays shaped (..., H, W, 3) in one pass.  
+    Any leading dimension is treated as a batch, each image with its own mean.  
+    `weights` (..., H, W) count each pixel that many times for the mean,
+    e.g. a palette weighted by how many pixels use each color.
+    
+    If an intermediate step would saturate, or the single pass could end more than 1 away
+    from chaining the steps, each step is applied in turn (still over the whole batch).
+    """
+    
+    means = _mean_rgb(array, weights)
+    lower = array.min(axis=(-3, -2))
+    upper = array.max(axis=(-3, -2))
+    luma = _mean_luma(array, weights) if steps[0][0] == 'contrast' else None
+    
+    if adjust_drifts(steps, means, luma) or adjust_saturates(steps, means, lower, upper):
+        return _adjust_stepwise(array, steps, weights)
+    
+    matrix, offset = adjust_matrix(steps, means, luma)
+    
+    # Flattens the pixels so it's a single (N, 3) @ (3, 3) product
+    pixels = array.reshape(-1, 3).astype(np.float32) @ matrix.T.astype(np.float32)
+    result = pixels.reshape(array.shape)
+    result += offset[..., None, None, :].astype(np.float32)
+    
+    np.clip(result, 0, 255, out=result)
+    
+    return result.astype(np.uint8)
 
+
+def adjust_saturates(
+        steps: Sequence[Adjustment],
+        means: np.typing.NDArray,
+        lower: np.typing.NDArray,
+        upper: np.typing.NDArray,
+    ) -> bool:
+    """Checks if any intermediate step may leave the 0-255 range.  
+    Uses interval arithmetic over the RGB bounding box (`lower`, `upper`).  
+    The fused pass can't reproduce that clipping, so it must not be used.
+    """
+    
+    means = np.asarray(means, np.float64)
+    lower = np.asarray(lower, np.float64)
+    upper = np.asarray(upper, np.float64)
+    
+    matrix, offset = np.eye(3), np.zeros_like(means)
+    
+    # The last step clips the same way in both cases
+    for name, factor in steps[:-1]:
+        step, shift = _adjust_step(name, factor, means @ matrix.T + offset)
+        matrix = step @ matrix
+        offset = offset @ step.T + shift
+        
+        positive, negative = np.clip(matrix, 0, None), np.clip(matrix, None, 0)
+        low = lower @ positive.T + upper @ negative.T + offset
+        high = upper @ positive.T + lower @ negative.T + offset
+        
+        if low.min() < 0 or high.max() > 255:
+            return True
+    
+    return False
+
+
+def adjust_drifts(
+        steps: Sequence[Adjustment],
+        means: np.typing.NDArray,
+        luma: np.typing.NDArray = None,
+    ) -> bool:
+    """Checks if the fused pass may end more than 1 away from chaining the steps.  
+    Bounds how far each channel can be pushed by what PIL rounds in between steps:
+    the truncations, the greyscale of `color` and the mean level of later `contrast` steps.
+    """
+    
+    means = np.asarray(means, np.float64)
+    
+    matrix, offset = np.eye(3), np.zeros_like(means)
+    drift = np.zeros_like(means)
+    
+    for idx, (name, factor) in enumerate(steps):
+        current = means @ matrix.T + offset
+        step, shift = _adjust_step(name, factor, current, luma if idx == 0 else None)
+        
+        drift = drift @ np.abs(step).T
+        
+        if name == 'color':
+            # Each pixel blends with its own rounded greyscale
+            drift += abs(1 - factor) * 0.5
+        
+        elif name == 'contrast' and idx > 0:
+            # The mean greyscale is only known within the drift, plus its rounding
+            center = current @ LUMA
+            spread = drift @ LUMA + 0.5
+            level = np.floor(center + 0.5)
+            error = np.maximum(level - np.floor(center - spread + 0.5), np.floor(center + spread + 0.5) - level)
+            drift += abs(1 - factor) * error[..., None]
+        
+        matrix = step @ matrix
+        offset = offset @ step.T + shift
+        
+        if idx < len(steps) - 1:
+            drift += 0.5
+            offset -= 0.5
+    
+    # Leaves a margin for PIL's float32 math
+    return bool(drift.max() > 0.99)
+
+
+def _adjust_step(
+        name: str,
+        factor: float,
+        means: np.typing.NDArray,
+        luma: np.typing.NDArray = None,
+    ) -> tuple[np.typing.NDArray, np.typing.NDArray]:
+    """Returns the color matrix and offsets of a single adjustment step.  
+    `contrast` uses the mean greyscale `luma` if known, else the one of `means`."""
+    
+    match name:
+        case 'brightness':
+            # Blends the image with black
+            step = factor * np.eye(3)
+            shift = np.zeros_like(means)
+        
+        case 'color':
+            # Blends each pixel with its own greyscale value
+            step = factor * np.eye(3) + (1 - factor) * np.outer(np.ones(3), LUMA)
+            shift = np.zeros_like(means)
+        
+        case 'contrast':
+            # Blends the image with its (rounded) average luminance
+            level = np.floor((means @ LUMA if luma is None else luma) + 0.5)
+            step = factor * np.eye(3)
+            shift = ((1 - factor) * level)[..., None] * np.ones(3)
+        
+        case _:
+            raise ValueError(f"Unknown adjustment: {name}")
+    
+    return step, shift
+
+
+def _luma(
+        array: np.typing.NDArray,
+    ) -> np.typing.NDArray:
+    """The greyscale of RGB arrays (..., H, W, 3), rounded exactly as PIL's RGB -> L."""
+    
+    weights = np.array([19595, 38470, 7471], np.int64)
+    
+    return (array.astype(np.int64) @ weights + 0x8000) >> 16
+
+
+def _mean_rgb(
+        array: np.typing.NDArray,
+        weights: np.typing.NDArray = None,
+    ) -> np.typing.NDArray:
+    """Returns the (optionally weighted) mean color of each image, (..., 3)."""
+    
+    if weights is None:
+        return array.mean(axis=(-3, -2), dtype=np.float64)
+    
+    weights = np.asarray(weights, np.float64)[..., None]
+    total = (array * weights).sum(axis=(-3, -2))
+    
+    return total / weights.sum(axis=(-3, -2))
+
+
+def _mean_luma(
+        array: np.typing.NDArray,
+        weights: np.typing.NDArray = None,
+    ) -> np.typing.NDArray:
+    """Returns the (optionally weighted) mean greyscale of each image, (...),
+    the level PIL's `contrast` blends with."""
+    
+    return _mean_rgb(_luma(array)[..., None], weights)[..., 0]
+
+
+def _adjust_stepwise(
+        array: np.typing.NDArray,
+        steps: Sequence[Adjustment],
+        weights: np.typing.NDArray = None,
+    ) -> np.typing.NDArray:
+    """Applies the `steps` one at a time, truncating like PIL does."""
+    
+    result = array.astype(np.float32)
+    
+    for name, factor in steps:
+        # Each step blends with a degenerate image, as PIL's ImageEnhance
+        match name:
+            case 'brightness':
+                grey = np.float32(0)
+            
+            case 'color':
+                # The greyscale is rounded to an image of its own first
+                grey = _luma(result).astype(np.float32)[..., None]
+            
+            case 'contrast':
+                level = np.floor(_mean_luma(result, weights) + 0.5)
+                grey = level.astype(np.float32)[..., None, None, None]
+            
+            case _:
+                raise ValueError(f"Unknown adjustment: {name}")
+        
+        result = grey + np.float32(factor) * (result - grey)
+        result = np.floor(np.clip(result, 0, 255))
+    
+    return result.astype(np.uint8)
+
+
+
+# ARRAY FILTERS # --------------------------------------------------------------
+def filter_array(
+        array: np.typing.NDArray,
+        kernel: ImageFilter.Kernel | ImageFilter.BuiltinFilter,
+        wrap: bool = True,
+    ) -> np.typing.NDArray:
+    """Applies a PIL convolution `kernel` over arrays shaped (..., H, W, C).  
+    The borders either `wrap` around or repeat the edge pixels.  
+    Any leading dimension is treated as a batch.
+    """
+    
+    (kw, kh), scale, offset, weights = kernel.filterargs
+    weights = np.reshape(weights, (kh, kw)).astype(int)
+    
+    rx, ry = kw // 2, kh // 2
+    H, W = array.shape[-3:-1]
+    
+    # Integer sums are exact and faster, as long as they fit in the type
+    dtype = np.int16 if np.abs(weights).sum() * 255 < 2**15 else np.int32
+    
+    pad_width = [(0, 0)] * (array.ndim - 3) + [(ry, ry), (rx, rx), (0, 0)]
+    padded = np.pad(array, pad_width, mode="wrap" if wrap else "edge").astype(dtype)
+    
+    # Groups the taps by weight, so each weight multiplies only once
+    result = np.zeros(array.shape, dtype)
+    for weight in np.unique(weights[weights != 0]):
+        taps = np.zeros(array.shape, dtype)
+        
+        for y, x in zip(*np.nonzero(weights == weight)):
+            taps += padded[..., y:y+H, x:x+W, :]
+        
+        if weight != 1:
+            taps *= weight
+        
+        result += taps
+    
+    # PIL rounds to the nearest integer: floor(sum / scale + offset + 0.5)
+    result = (2 * result.astype(np.int32) + (2 * offset + 1) * scale) // (2 * scale)
+    
+    return np.clip(result, 0, 255).astype(np.uint8)
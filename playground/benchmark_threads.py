@@ -0,0 +1,85 @@
+"""Compares rendering Tiles serially and over a thread pool with `render_many`.
+
+Runs from anywhere, importing the package of this checkout:
+
+```
+python playground/benchmark_threads.py --tiles 64 --size 256 --workers 4
+```
+
+Measured on a single core machine (Python 3.12, Pillow 11), so without any gain to show:
+64 tiles of 256px take 0.245s serially and 0.289s over 4 threads (0.85x),
+and 1.17s against 1.19s at 512px over 2 threads (0.99x).
+The threads only pay off with more cores, as Pillow releases the GIL while blending.
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+# Imports the package of this checkout, from wherever it's run
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jabutiles.tile import Tile
+from jabutiles.layer import Layer
+from jabutiles.shade import Shade
+from jabutiles.render import render_many
+from jabutiles.texture import TextureGen
+from jabutiles.maskgen import MaskGen, ShapeMaskGen
+
+
+
+def make_tiles(
+        count: int,
+        size: int,
+    ) -> list[Tile]:
+    """Fresh (not yet rendered) Tiles, sharing their textures and masks."""
+    
+    grass = TextureGen.named_texture(size, 'grass', seed=1)
+    dirt = TextureGen.named_texture(size, 'dirt', seed=2)
+    shape = ShapeMaskGen.orthogonal(size)
+    
+    rng = np.random.default_rng(0)
+    masks = [MaskGen.noise((size, size), (0, 255), rng) for _ in range(8)]
+    
+    return [
+        Tile([
+            Layer(grass),
+            Layer(dirt, masks[idx % len(masks)], Shade(0.8, offset=1), Shade(0.6, offset=2)),
+            Layer(None, shape),
+        ])
+        for idx in range(count)
+    ]
+
+
+def timed(
+        tiles: list[Tile],
+        workers: int,
+    ) -> float:
+    
+    start = time.perf_counter()
+    render_many(tiles, workers)
+    
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tiles', type=int, default=64)
+    parser.add_argument('--size', type=int, default=256)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    serial = min(timed(make_tiles(args.tiles, args.size), 0) for _ in range(args.repeat))
+    threaded = min(timed(make_tiles(args.tiles, args.size), args.workers) for _ in range(args.repeat))
+    
+    print(f"{args.tiles} tiles of {args.size}px")
+    print(f"serial     : {serial:.3f}s")
+    print(f"{args.workers} threads : {threaded:.3f}s ({serial / threaded:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
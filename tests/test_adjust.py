@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from jabutiles.texture import Texture, TextureGen, TextureStack
+from jabutiles.utils_img import adjust_array
+
+
+FACTORS = (0.05, 0.5, 0.666, 0.75, 0.9, 1.1, 1.2, 1.5)
+
+
+def chained(texture: Texture, factors: dict[str, float]) -> np.typing.NDArray:
+    for name, factor in factors.items():
+        texture = getattr(texture, name)(factor)
+    
+    return texture.as_array.astype(int)
+
+
+def random_chains(count: int, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    names = ['brightness', 'color', 'contrast']
+    
+    for _ in range(count):
+        low = rng.integers(0, 100)
+        array = rng.integers(low, rng.integers(low + 20, 256), (24, 40, 3), dtype=np.uint8)
+        order = rng.permutation(names)[:rng.integers(1, 4)]
+        
+        yield array, {str(name): float(rng.choice(FACTORS)) for name in order}
+
+
+def test_adjust_matches_chained():
+    for array, factors in random_chains(300):
+        fused = Texture(array).adjust(**factors).as_array.astype(int)
+        
+        assert np.abs(fused - chained(Texture(array), factors)).max() <= 1, factors
+
+
+def test_adjust_array_matches_chained():
+    for array, factors in random_chains(100, seed=2):
+        fused = adjust_array(array, list(factors.items())).astype(int)
+        
+        assert np.abs(fused - chained(Texture(array), factors)).max() <= 1, factors
+
+
+def test_adjust_stack_matches_chained():
+    stack = TextureGen.random_rgb_batch(4, (32, 24), ((80, 8), (32, 6), (16, 4)), 'avgdev',
+                                        np.random.default_rng(3))
+    factors = {'contrast': 0.666, 'color': 0.75, 'brightness': 1.1}
+    
+    fused = stack.adjust(**factors).array.astype(int)
+    
+    for idx, texture in enumerate(stack):
+        assert np.abs(fused[idx] - chained(texture, factors)).max() <= 1
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_wood_recipe_matches_chained(seed: int):
+    np.random.seed(seed)
+    texture = TextureGen.random_rgb((64, 16), ((80, 8), (32, 6), (16, 4)), 'avgdev').scale((1, 4)).smooth(3)
+    factors = {'contrast': 0.666, 'color': 0.75, 'brightness': 1.1}
+    
+    fused = texture.adjust(**factors).as_array.astype(int)
+    
+    assert np.abs(fused - chained(texture, factors)).max() <= 1
@@ -0,0 +1,28 @@
+import numpy as np
+
+from jabutiles.mask import Mask
+from jabutiles.layer import Layer
+from jabutiles.shade import Shade
+from jabutiles.texture import Texture
+from jabutiles.maskgen import ShapeMaskGen
+from jabutiles.animation import AnimatedTile
+
+
+def test_static_frames_dont_flicker():
+    grass = Texture(np.full((16, 16, 3), (40, 90, 20), np.uint8))
+    sand = Texture(np.full((16, 16, 3), (200, 180, 120), np.uint8))
+    
+    edge = np.zeros((16, 16), np.uint8)
+    edge[:, :8] = 255
+    
+    layers = [
+        Layer(grass),
+        Layer(sand, Mask(edge), on_other=Shade(0.6, outline=1.5, dist=0.5)),
+        Layer(None, ShapeMaskGen.orthogonal((16, 16))),
+    ]
+    tile = AnimatedTile(layers, {1: [sand] * 4})
+    
+    first, *others = [np.asarray(image) for image in tile.images()]
+    
+    for frame in others:
+        assert np.array_equal(frame, first)
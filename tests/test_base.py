@@ -0,0 +1,35 @@
+import numpy as np
+from PIL import Image
+
+from jabutiles.mask import Mask
+from jabutiles.texture import Texture
+
+
+def test_mask_owns_its_array():
+    array = np.zeros((4, 4), np.uint8)
+    mask = Mask(array)
+    
+    array[:] = 255
+    
+    assert not np.asarray(mask.image).any()
+    assert mask.bbox is None
+
+
+def test_texture_owns_its_image():
+    image = Image.new('RGB', (4, 4))
+    texture = Texture(image)
+    
+    image.paste((255, 0, 0), (0, 0, 4, 4))
+    
+    assert not np.asarray(texture.image).any()
+
+
+def test_mask_bbox_after_source_change():
+    image = Image.new('L', (4, 4))
+    mask = Mask(image)
+    assert mask.bbox is None
+    
+    image.paste(255, (0, 0, 4, 4))
+    
+    assert mask.bbox is None
+    assert Mask(image).bbox == (0, 0, 4, 4)
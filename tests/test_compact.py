@@ -0,0 +1,52 @@
+import random
+
+import numpy as np
+
+from jabutiles.texture import Texture
+from jabutiles.compact import IndexedTexture
+
+
+def test_offset_fills_with_black():
+    array = np.zeros((4, 6, 3), np.uint8)
+    array[..., 0] = 200
+    array[:, 3:] = (10, 20, 30)
+    
+    texture = Texture(array)
+    indexed = texture.indexed()
+    
+    assert not (indexed.palette == 0).all(axis=1).any()
+    
+    for offset in ((2, 1), (-3, 0), 1):
+        shifted = indexed.offset(offset)
+        
+        assert isinstance(shifted, IndexedTexture)
+        assert np.array_equal(shifted.to_texture().as_array, texture.offset(offset).as_array)
+
+
+def test_offset_reuses_black_entry():
+    array = np.zeros((4, 4, 3), np.uint8)
+    array[:2] = (90, 90, 90)
+    
+    indexed = Texture(array).indexed()
+    shifted = indexed.offset((0, 2))
+    
+    assert shifted.colors == indexed.colors
+    assert np.array_equal(shifted.to_texture().as_array, Texture(array).offset((0, 2)).as_array)
+
+
+def test_rotate_and_repeat_fill_with_black():
+    array = np.zeros((4, 6, 3), np.uint8)
+    array[..., 0] = 200
+    array[:, 3:] = (10, 20, 30)
+    
+    texture = Texture(array)
+    indexed = texture.indexed()
+    
+    rotated = indexed.rotate(90, expand=False)
+    assert np.array_equal(rotated.to_texture().as_array, texture.rotate(90, expand=False).as_array)
+    
+    repeated = indexed.repeat((12, 12), ['x'], [0, 90], random.Random(1))
+    assert np.array_equal(repeated.to_texture().as_array,
+                          texture.repeat((12, 12), ['x'], [0, 90], random.Random(1)).as_array)
+    
+    assert (repeated.to_texture().as_array == 0).all(axis=-1).any()
@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from jabutiles.export import PNGStreamWriter, save_image, export_many
+
+
+def test_stream_writer_roundtrip(tmp_path):
+    path = str(tmp_path / 'map.png')
+    array = np.random.default_rng(0).integers(0, 256, (37, 21, 4), np.uint8)
+    
+    with PNGStreamWriter(path, (21, 37), chunk_size=256) as png:
+        for top in range(0, 37, 8):
+            png.write_rows(array[top:top+8])
+    
+    with Image.open(path) as image:
+        assert np.array_equal(np.asarray(image), array)
+
+
+def test_stream_writer_error_removes_file(tmp_path):
+    path = str(tmp_path / 'map.png')
+    
+    with pytest.raises(ZeroDivisionError):
+        with PNGStreamWriter(path, (4, 4)) as png:
+            png.write_rows(np.zeros((2, 4, 4), np.uint8))
+            1 / 0
+    
+    assert png._file.closed
+    assert not os.path.exists(path)
+
+
+def test_stream_writer_missing_rows(tmp_path):
+    path = str(tmp_path / 'map.png')
+    png = PNGStreamWriter(path, (4, 4))
+    png.write_rows(np.zeros((3, 4, 4), np.uint8))
+    
+    with pytest.raises(AssertionError):
+        png.close()
+    
+    assert png._file.closed
+    assert not os.path.exists(path)
+
+
+@pytest.mark.parametrize('ext', ['jpg', 'jpeg', 'tif', 'png', 'webp'])
+def test_save_image_by_extension(tmp_path, ext):
+    array = np.full((16, 16, 3), (200, 120, 40), np.uint8)
+    
+    path = save_image(Image.fromarray(array), str(tmp_path / f'tile.{ext}'), quality=95)
+    
+    with Image.open(path) as image:
+        assert np.abs(np.asarray(image.convert('RGB'), int) - array).max() <= 3
+
+
+def test_export_many_jpg_roundtrip(tmp_path):
+    rgba = np.random.default_rng(1).integers(0, 256, (8, 8, 4), np.uint8)
+    rgba[..., :3] = 90
+    
+    paths = {str(tmp_path / f'{idx}.jpg'): Image.fromarray(rgba) for idx in range(3)}
+    export_many(paths, quality=95)
+    
+    for path in paths:
+        with Image.open(path) as image:
+            assert image.format == 'JPEG'
+            assert np.abs(np.asarray(image, int) - 90).max() <= 2
@@ -0,0 +1,17 @@
+import numpy as np
+from PIL import Image
+
+from jabutiles.texture import Texture
+from jabutiles.loader import load_image
+
+
+def test_loads_dont_share_the_cached_image(tmp_path):
+    path = str(tmp_path / 'flat.png')
+    Image.new('RGB', (4, 4), (10, 20, 30)).save(path)
+    
+    first = Texture(path)
+    first.image.paste((255, 0, 0), (0, 0, 4, 4))
+    load_image(path, 'RGB').paste((0, 255, 0), (0, 0, 4, 4))
+    
+    assert Texture(path).image.getpixel((0, 0)) == (10, 20, 30)
+    assert np.asarray(first.image)[0, 0].tolist() == [255, 0, 0]
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from jabutiles.atlas import AtlasBuilder
+from jabutiles.mipmap import count_levels, pyramid
+
+
+@pytest.mark.parametrize('size, levels', [((1, 1), 1), ((2, 2), 2), ((32, 32), 6), ((48, 20), 7), ((33, 8), 7)])
+def test_count_levels(size, levels):
+    assert count_levels(size) == levels
+
+
+def test_pyramid_ends_at_one_pixel():
+    image = Image.fromarray(np.zeros((20, 48, 4), np.uint8))
+    
+    assert pyramid(image)[-1].size == (1, 1)
+
+
+def test_atlas_rejects_misaligned_sizes(tmp_path):
+    with pytest.raises(AssertionError):
+        AtlasBuilder(str(tmp_path / 'atlas'), padding=2, mipmaps=2)
+    
+    atlas = AtlasBuilder(str(tmp_path / 'atlas'), padding=4, mipmaps=2)
+    
+    with pytest.raises(AssertionError):
+        atlas.add('odd', Image.new('RGBA', (12, 10)))
+    
+    atlas.add('even', Image.new('RGBA', (12, 8)))
+
+
+def test_pyramid_averages_palette_colors():
+    image = Image.new('P', (2, 2))
+    image.putpalette([0, 0, 0, 200, 100, 40])
+    image.putpixel((0, 0), 1)
+    image.putpixel((1, 1), 1)
+    
+    levels = pyramid(image)
+    
+    assert levels[-1].mode == 'RGBA'
+    assert levels[-1].getpixel((0, 0)) == (100, 50, 20, 255)
+
+
+def test_pyramid_rejects_wide_modes():
+    with pytest.raises(AssertionError):
+        pyramid(Image.new('I', (4, 4)))
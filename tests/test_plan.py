@@ -0,0 +1,39 @@
+import numpy as np
+
+from jabutiles.plan import Plan, build_in_worker
+from jabutiles.recipe import Recipe
+
+
+SPEC = {
+    "size": 16,
+    "materials": {
+        "grass": {"texture": "grass", "seed": 1},
+        "dirt":  {"texture": "dirt", "seed": 2},
+    },
+    "masks": {
+        "edge": {"op": "mask.lines", "args": [[[[0, 0], [16, 0], 4]]]},
+    },
+    "tiles": {
+        "grass": {"base": "grass"},
+        "grass_dirt": {"base": "grass", "layers": [{"material": "dirt", "mask": "edge"}]},
+    },
+}
+
+
+def test_worker_builds_once_per_run():
+    recipe = Recipe('shape.orthogonal', (8, 8))
+    
+    first = build_in_worker('a', recipe)
+    assert build_in_worker('a', recipe) is first
+    assert build_in_worker('b', recipe) is not first
+
+
+def test_parallel_run_matches_serial():
+    plan = Plan.compile(SPEC)
+    
+    serial = {name: np.asarray(image) for name, image in plan.run()}
+    parallel = {name: np.asarray(image) for name, image in plan.run(workers=2)}
+    
+    assert serial.keys() == parallel.keys()
+    for name in serial:
+        assert np.array_equal(serial[name], parallel[name])
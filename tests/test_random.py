@@ -0,0 +1,23 @@
+import numpy as np
+
+from jabutiles.texture import TextureGen
+
+
+RANGES = [(0, 255), (10, 40), (5, 9)]
+
+
+def test_random_rgb_draws_each_channel_in_turn():
+    np.random.seed(7)
+    texture = TextureGen.random_rgb((6, 4), RANGES)
+    
+    np.random.seed(7)
+    expected = np.stack([np.random.randint(low, high, (4, 6), np.uint8) for low, high in RANGES], axis=-1)
+    
+    assert np.array_equal(texture.as_array, expected)
+
+
+def test_random_rgb_batch_is_a_single_block():
+    stack = TextureGen.random_rgb_batch(5, (6, 4), RANGES, rng=np.random.default_rng(3))
+    expected = np.random.default_rng(3).integers([0, 10, 5], [255, 40, 9], (5, 4, 6, 3), np.uint8)
+    
+    assert np.array_equal(stack.array, expected)
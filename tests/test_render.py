@@ -0,0 +1,64 @@
+import random
+from functools import partial
+
+import numpy as np
+
+from jabutiles.tile import Tile
+from jabutiles.layer import Layer
+from jabutiles.shade import Shade
+from jabutiles.maskgen import MaskGen
+from jabutiles.texture import TextureGen
+from jabutiles.render import render_many, render_one
+
+
+def outlined_tile(seed: int) -> Tile:
+    grass = TextureGen.named_texture(48, 'grass', seed=1)
+    dirt = TextureGen.named_texture(48, 'dirt', seed=2)
+    blob = MaskGen.blob_draw((48, 48), [((24, 24), 12)])
+    
+    return Tile([Layer(grass), Layer(dirt, blob, on_other=Shade(0.5, outline=3, dist=0.5, seed=seed))])
+
+
+def test_seeded_shades_render_the_same_in_threads():
+    random.seed(0)
+    serial = [np.asarray(outlined_tile(seed).image) for seed in range(8)]
+    
+    random.seed(1)
+    threaded = render_many([outlined_tile(seed) for seed in range(8)], workers=4)
+    
+    for expected, image in zip(serial, threaded):
+        assert np.array_equal(np.asarray(image), expected)
+    
+    assert not np.array_equal(serial[0], serial[1])
+
+
+def test_rng_overrides_seed():
+    tile = outlined_tile(3)
+    
+    first = Tile.composite(tile._layers, rng=random.Random(5))
+    second = Tile.composite(tile._layers, rng=random.Random(5))
+    
+    assert np.array_equal(np.asarray(first), np.asarray(second))
+    assert not np.array_equal(np.asarray(first), np.asarray(tile.image))
+
+
+def noisy_texture():
+    return TextureGen.random_rgb(8, [(0, 256)] * 3).repeat((16, 16), ['x', 'y'], [0, 90])
+
+
+def test_render_one_keeps_the_global_states():
+    random.seed(11)
+    np.random.seed(11)
+    expected = random.random(), np.random.random()
+    
+    random.seed(11)
+    np.random.seed(11)
+    first = render_one(noisy_texture, seed=5)
+    second = render_one(noisy_texture, seed=5)
+    
+    # Unseeded shades draw from the seeded global state while the tile renders
+    tiles = [render_one(partial(outlined_tile, None), seed=5) for _ in range(2)]
+    
+    assert (random.random(), np.random.random()) == expected
+    assert np.array_equal(np.asarray(first), np.asarray(second))
+    assert np.array_equal(np.asarray(tiles[0]), np.asarray(tiles[1]))
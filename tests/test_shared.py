@@ -0,0 +1,21 @@
+import gc
+from multiprocessing import shared_memory
+
+import pytest
+import numpy as np
+
+from jabutiles.mask import Mask
+from jabutiles.shared import SharedPool
+
+
+def test_pool_frees_its_blocks_when_collected():
+    pool = SharedPool()
+    handle = pool.publish('ring', Mask(np.full((8, 8), 200, np.uint8)))
+    
+    assert np.asarray(handle.attach().image).min() == 200
+    
+    del pool
+    gc.collect()
+    
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(handle.name)
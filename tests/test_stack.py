@@ -0,0 +1,17 @@
+import numpy as np
+import pytest
+
+from jabutiles.texture import TextureGen
+
+
+@pytest.mark.parametrize('level, tolerance', [(-1, 0), (1, 0), (2, 1), (3, 0)])
+@pytest.mark.parametrize('wrap', [True, False])
+def test_stack_smooth_matches_textures(level, tolerance, wrap):
+    stack = TextureGen.random_rgb_batch(3, (24, 16), [(0, 256)] * 3, rng=np.random.default_rng(level + 1))
+    
+    smoothed = stack.smooth(level, wrap).array.astype(int)
+    
+    for idx, texture in enumerate(stack):
+        expected = texture.smooth(level, wrap).as_array.astype(int)
+        
+        assert np.abs(smoothed[idx] - expected).max() <= tolerance
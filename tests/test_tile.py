@@ -0,0 +1,26 @@
+import numpy as np
+
+from jabutiles.tile import Tile
+from jabutiles.mask import Mask
+from jabutiles.layer import Layer
+from jabutiles.texture import Texture
+from jabutiles.maskgen import ShapeMaskGen
+from jabutiles.utils_img import cut_image
+
+
+def test_mask_only_layer_below_others():
+    base = Texture(np.full((16, 16, 3), (40, 90, 20), np.uint8))
+    
+    ring = np.zeros((16, 16), np.uint8)
+    ring[4:12, 4:12] = 180
+    ring = Mask(ring)
+    
+    shape = ShapeMaskGen.isometric((16, 16))
+    
+    tile = Tile([Layer(base), Layer(None, ring), Layer(None, shape)])
+    
+    expected = base.image.copy()
+    expected.paste(ring.image, mask=ring.image)
+    expected = cut_image(expected, shape.image)
+    
+    assert np.array_equal(np.asarray(tile.image), np.asarray(expected))
@@ -0,0 +1,17 @@
+import numpy as np
+import pytest
+
+from jabutiles.texture import TextureGen
+from jabutiles.tilemap import MapCanvas, composite_map
+
+
+@pytest.mark.parametrize('shape, size', [('isometric', (32, 16)), ('hexagonal.flat', (32, 28))])
+def test_canvas_matches_composite_map(shape, size):
+    tiles = {idx: TextureGen.named_texture(size, name, seed=idx) for idx, name in enumerate(['grass', 'water'])}
+    terrain = np.random.default_rng(0).integers(0, 2, (6, 5))
+    
+    canvas = MapCanvas(terrain, tiles, shape)
+    assert np.array_equal(canvas.array, composite_map(terrain, tiles, shape))
+    
+    canvas.edit({(2, 3): 1 - terrain[2, 3]})
+    assert np.array_equal(canvas.array, composite_map(canvas.tiles, tiles, shape))